@@ -1,13 +1,11 @@
 #!/usr/bin/env python3
 """
 GitHub-based Template Handler for LXC Compose
-Fetches templates and services directly from GitHub without caching
+Fetches templates and services directly from GitHub (each file at most once per run, no on-disk cache)
 """
 
 import os
-import yaml
 import subprocess
-import tempfile
 from typing import Dict, Any, Optional, List
 from urllib.parse import urlparse
 
@@ -30,6 +28,9 @@ class GitHubTemplateHandler:
         parts = parsed.path.strip('/').split('/')
         self.owner = parts[0] if len(parts) > 0 else "unomena"
         self.repo = parts[1].replace('.git', '') if len(parts) > 1 else "lxc-compose"
+        
+        # Files already fetched in this run (containers often share templates/services)
+        self.fetched = {}
     
     def get_github_raw_url(self, path: str) -> str:
         """Generate GitHub raw content URL"""
@@ -45,6 +46,9 @@ class GitHubTemplateHandler:
         Returns:
             File contents as string, or None if failed
         """
+        if path in self.fetched:
+            return self.fetched[path]
+        
         url = self.get_github_raw_url(path)
         try:
             result = subprocess.run(
@@ -58,6 +62,7 @@ class GitHubTemplateHandler:
                 content = result.stdout
                 # Check if it's a valid response (not 404)
                 if '404: Not Found' not in content and '<html>' not in content[:100]:
+                    self.fetched[path] = content
                     return content
         except (subprocess.TimeoutExpired, subprocess.SubprocessError) as e:
             print(f"Error fetching {url}: {e}")
@@ -71,7 +76,8 @@ class GitHubTemplateHandler:
         content = self.fetch_from_github(github_path)
         
         if content:
-            config = yaml.safe_load(content)
+            import yaml
+            config = yaml.load(content, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
             
             # Handle alias templates
             if 'alias' in config:
@@ -118,7 +124,8 @@ class GitHubTemplateHandler:
         content = self.fetch_from_github(github_path)
         
         if content:
-            config = yaml.safe_load(content)
+            import yaml
+            config = yaml.load(content, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
             
             # Extract container configuration
             if 'containers' in config:
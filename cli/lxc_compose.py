@@ -8,37 +8,46 @@ import os
 import sys
 import time
 import json
-import yaml
+import fcntl
+import functools
 import click
 import subprocess
+import shutil
 import re
+import heapq
 from typing import Dict, Any, Optional, List
 
 # Import template handler - prefer GitHub handler, fallback to local
 # Can be forced to use local with LXC_COMPOSE_USE_LOCAL=true
-USING_GITHUB_HANDLER = False
 USE_LOCAL = os.environ.get('LXC_COMPOSE_USE_LOCAL', '').lower() in ['true', '1', 'yes']
 
-if USE_LOCAL:
-    # Force local template handler
-    from template_handler import TemplateHandler
-else:
+def import_template_handler():
+    """Import the template handler class, returning (TemplateHandler, using_github)
+    
+    Only commands that process a config need it, so it isn't imported at startup.
+    """
+    if USE_LOCAL:
+        # Force local template handler
+        from template_handler import TemplateHandler
+        return TemplateHandler, False
+    
     # Default behavior - try GitHub first, fallback to local
     try:
-        from github_template_handler import GitHubTemplateHandler as TemplateHandler
-        USING_GITHUB_HANDLER = True
+        from github_template_handler import GitHubTemplateHandler
+        return GitHubTemplateHandler, True
     except ImportError:
         try:
             from template_handler import TemplateHandler
+            return TemplateHandler, False
         except ImportError:
             # Fallback if module not in path
-            import sys
             sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
             try:
-                from github_template_handler import GitHubTemplateHandler as TemplateHandler
-                USING_GITHUB_HANDLER = True
+                from github_template_handler import GitHubTemplateHandler
+                return GitHubTemplateHandler, True
             except ImportError:
                 from template_handler import TemplateHandler
+                return TemplateHandler, False
 
 # Terminal colors
 RED = '\033[0;31m'
@@ -64,6 +73,46 @@ CONTAINER_METADATA_FILE = os.path.join(DATA_DIR, 'container-metadata.json')
 # Port forwarding mappings file
 PORT_MAPPINGS_FILE = os.path.join(DATA_DIR, 'port-mappings.json')
 
+# Test categories each test type selects
+TEST_TYPE_CATEGORIES = {
+    'all': frozenset({'internal', 'external', 'port_forwarding'}),
+    'internal': frozenset({'internal'}),
+    'external': frozenset({'external'}),
+    'port_forwarding': frozenset({'port_forwarding'}),
+}
+
+# Test types accepted by the test command (besides 'list')
+TEST_TYPES = tuple(TEST_TYPE_CATEGORIES)
+
+# Maximum number of concurrent lxc operations for --all commands
+MAX_PARALLEL_OPERATIONS = 16
+
+# Already root (e.g. run via 'sudo lxc-compose ...'), so sudo prefixes are dropped
+RUNNING_AS_ROOT = os.geteuid() == 0
+
+# Parsed config cache (skips YAML parsing when the config is unchanged)
+# Can be disabled with LXC_COMPOSE_NOCACHE=true
+CONFIG_CACHE_SUFFIX = '.cache.json'
+USE_CONFIG_CACHE = os.environ.get('LXC_COMPOSE_NOCACHE', '').lower() not in ['true', '1', 'yes']
+
+# Top-level device names in 'lxc config device show' output
+DEVICE_NAME_RE = re.compile(r'^([^\s:]+):', re.MULTILINE)
+
+# Enables and starts supervisor under the container's init system
+SUPERVISOR_AUTOSTART_SCRIPT = """\
+if command -v systemctl >/dev/null 2>&1; then
+    # Systemd-based system (Ubuntu, Debian, etc.)
+    systemctl enable supervisor
+    systemctl start supervisor
+elif command -v rc-update >/dev/null 2>&1; then
+    # OpenRC-based system (Alpine)
+    rc-update add supervisord default
+    rc-service supervisord start
+else
+    # Fallback: just start supervisord directly
+    supervisord -c /etc/supervisord.conf
+fi"""
+
 # Web ports that should be auto-forwarded (common HTTP/HTTPS and app server ports)
 WEB_PORTS = {
     80,    # HTTP
@@ -120,24 +169,67 @@ INTERNAL_PORTS = {
     29015,  # RethinkDB
 }
 
+def load_yaml(stream):
+    """Parse YAML, importing PyYAML only when a config actually needs parsing"""
+    import yaml
+    # Prefer the libyaml-backed C loader, fall back to the pure-Python one
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    return yaml.load(stream, Loader=loader)
+
+@functools.lru_cache(maxsize=None)
+def resolve_executable(name: str) -> str:
+    """Resolve a command name to its absolute path (looked up once per process)"""
+    return shutil.which(name) or name
+
+def spawn(cmd, **kwargs) -> subprocess.CompletedProcess:
+    """Run a command via subprocess.run on its posix_spawn fast path
+    
+    CPython only uses posix_spawn (vfork-style, no page table copy) instead of
+    fork+exec when the executable is an absolute path and close_fds is False.
+    File descriptors opened by Python are non-inheritable, so nothing leaks.
+    When already running as root a leading 'sudo' is skipped entirely.
+    """
+    if RUNNING_AS_ROOT and len(cmd) > 1 and cmd[0] == 'sudo' and not cmd[1].startswith('-'):
+        cmd = cmd[1:]
+    argv = [resolve_executable(cmd[0]), *cmd[1:]]
+    return subprocess.run(argv, close_fds=False, **kwargs)
+
+def sudo_write(path: str, content: str, append: bool = False):
+    """Write (or append) content to a root-owned file through sudo tee
+    
+    The content goes over stdin, so there is no shell to start and nothing
+    in it is quoted or expanded.
+    """
+    cmd = ['sudo', 'tee', '-a', path] if append else ['sudo', 'tee', path]
+    # Same encoding as read_hosts, so hosts content round-trips byte for byte
+    spawn(cmd, input=content, stdout=subprocess.DEVNULL, text=True,
+          encoding='utf-8', errors='surrogateescape', check=True)
+
 class LXCCompose:
     def __init__(self, config_file: str = None, all_containers: bool = False):
         self.all_containers = all_containers
         self.config_file = config_file
+        # Relative mounts, .env and test paths resolve against the config's directory
+        self.config_dir = os.path.dirname(os.path.abspath(config_file)) if config_file else None
         self.env_vars = {}
+        self.env_file = None  # Path of the project's .env file, set if it exists
+        self.dependency_cycle = None  # Set by sort_by_dependencies if depends_on loops
+        self.query_instance_state = True  # Cleared by get_container_ip outside the default project
         
-        # Initialize template handler with GitHub support
-        if USING_GITHUB_HANDLER:
-            # Allow customization via environment variables
-            repo_url = os.environ.get('LXC_COMPOSE_REPO', 'https://github.com/unomena/lxc-compose')
-            branch = os.environ.get('LXC_COMPOSE_BRANCH', 'main')
-            self.template_handler = TemplateHandler(repo_url=repo_url, branch=branch)
-            if not all_containers:
+        # Initialize template handler with GitHub support (only needed to process a config)
+        self.template_handler = None
+        if not all_containers:
+            TemplateHandler, using_github = import_template_handler()
+            if using_github:
+                # Allow customization via environment variables
+                repo_url = os.environ.get('LXC_COMPOSE_REPO', 'https://github.com/unomena/lxc-compose')
+                branch = os.environ.get('LXC_COMPOSE_BRANCH', 'main')
+                self.template_handler = TemplateHandler(repo_url=repo_url, branch=branch)
                 click.echo(f"{GREEN}Using GitHub templates from {repo_url} ({branch}){NC}")
-        else:
-            self.template_handler = TemplateHandler()
-            if not all_containers and USE_LOCAL:
-                click.echo(f"{GREEN}Using local templates (LXC_COMPOSE_USE_LOCAL=true){NC}")
+            else:
+                self.template_handler = TemplateHandler()
+                if USE_LOCAL:
+                    click.echo(f"{GREEN}Using local templates (LXC_COMPOSE_USE_LOCAL=true){NC}")
         
         if not all_containers:
             if not config_file or not os.path.exists(config_file):
@@ -151,7 +243,7 @@ class LXCCompose:
             self.config = self.load_config()
             # Process templates before parsing containers
             self.config = self.template_handler.process_compose_file(self.config)
-            self.containers = self.parse_containers()
+            self.containers = self.sort_by_dependencies(self.parse_containers())
         else:
             self.config = {}
             self.containers = []
@@ -161,18 +253,18 @@ class LXCCompose:
     
     def load_env_file(self):
         """Load environment variables from .env file"""
-        config_dir = os.path.dirname(os.path.abspath(self.config_file))
-        env_file = os.path.join(config_dir, DEFAULT_ENV_FILE)
+        env_file = os.path.join(self.config_dir, DEFAULT_ENV_FILE)
         
         if os.path.exists(env_file):
+            self.env_file = env_file
             click.echo(f"  Loading environment from {DEFAULT_ENV_FILE}")
             with open(env_file, 'r') as f:
                 for line in f:
                     line = line.strip()
                     # Skip comments and empty lines
                     if line and not line.startswith('#'):
-                        if '=' in line:
-                            key, value = line.split('=', 1)
+                        key, sep, value = line.partition('=')
+                        if sep:
                             # Remove quotes if present
                             key = key.strip()
                             value = value.strip().strip('"').strip("'")
@@ -180,8 +272,38 @@ class LXCCompose:
                             # Also set in current environment for variable expansion
                             os.environ[key] = value
             
+    def get_config_cache_path(self) -> str:
+        """Get the parsed-config cache location for the current config file
+        
+        The cached config has .env values substituted into it, so it is kept in the
+        per-user cache directory rather than next to the config in the project tree.
+        """
+        import hashlib
+        cache_dir = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+        config_path = os.path.join(self.config_dir, os.path.basename(self.config_file))
+        path_hash = hashlib.sha1(config_path.encode()).hexdigest()[:16]
+        return os.path.join(cache_dir, 'lxc-compose', f'{path_hash}{CONFIG_CACHE_SUFFIX}')
+    
     def load_config(self) -> Dict:
-        """Load configuration from YAML file"""
+        """Load configuration from YAML file (cached while the file is unchanged)"""
+        import hashlib
+        # Cache is keyed on the file's mtime/size and a hash of the .env substitutions
+        # (the values themselves may be secrets, so they aren't stored in the key)
+        stat = os.stat(self.config_file)
+        env_hash = hashlib.sha256(json.dumps(sorted(self.env_vars.items())).encode()).hexdigest()
+        cache_key = [stat.st_mtime_ns, stat.st_size, env_hash]
+        cache_file = self.get_config_cache_path() if USE_CONFIG_CACHE else None
+        
+        if cache_file:
+            try:
+                with open(cache_file, 'r') as f:
+                    cached = json.load(f)
+                if cached.get('key') == cache_key:
+                    return cached['config']
+            except Exception:
+                # Missing, stale or corrupt cache - just re-parse
+                pass
+        
         with open(self.config_file, 'r') as f:
             content = f.read()
             
@@ -190,7 +312,26 @@ class LXCCompose:
                 content = content.replace(f'${{{key}}}', value)
                 content = content.replace(f'${key}', value)
             
-            return yaml.safe_load(content)
+            config = load_yaml(content)
+        
+        if cache_file:
+            try:
+                content = json.dumps({'key': cache_key, 'config': config})
+                # Only cache configs that survive a JSON round trip unchanged
+                # (e.g. YAML dates or non-string keys would not)
+                if json.loads(content)['config'] == config:
+                    os.makedirs(os.path.dirname(cache_file), mode=0o700, exist_ok=True)
+                    tmp_file = f'{cache_file}.{os.getpid()}.tmp'
+                    # Readable by the owner only, it can contain substituted .env values
+                    fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                    with os.fdopen(fd, 'w') as f:
+                        f.write(content)
+                    os.replace(tmp_file, cache_file)
+            except (OSError, TypeError, ValueError):
+                # Caching is best-effort only
+                pass
+        
+        return config
     
     def parse_containers(self):
         """Parse containers from either list or dictionary format"""
@@ -210,10 +351,71 @@ class LXCCompose:
         else:
             return []
     
-    def run_command(self, cmd, check: bool = True):
-        """Run a command and return the result"""
+    def sort_by_dependencies(self, containers: List[Dict]) -> List[Dict]:
+        """Order containers so each one comes after the containers it depends on
+        
+        Kahn's algorithm, always taking the earliest ready container in config
+        file order (O((N+E) log N)), so the result is the stable topological order:
+        the config order is only changed where a dependency requires it.
+        """
+        by_name = {c['name']: c for c in containers}
+        if len(by_name) != len(containers):
+            # Duplicate names, leave the config order alone
+            return containers
+        
+        in_degree = {name: 0 for name in by_name}
+        dependents = {name: [] for name in by_name}
+        dependencies = {name: [] for name in by_name}
+        for name, container in by_name.items():
+            deps = container.get('depends_on') or []
+            if isinstance(deps, str):
+                deps = [deps]
+            for dep in deps:
+                # Dependencies outside this config are handled by handle_dependencies
+                if dep in by_name:
+                    in_degree[name] += 1
+                    dependents[dep].append(name)
+                    dependencies[name].append(dep)
+        
+        # Ready containers are kept in a heap keyed by their position in the config
+        position = {name: index for index, name in enumerate(by_name)}
+        ready = [(position[name], name) for name, degree in in_degree.items() if degree == 0]
+        heapq.heapify(ready)
+        ordered = []
+        while ready:
+            _, name = heapq.heappop(ready)
+            ordered.append(by_name[name])
+            for dependent in dependents[name]:
+                in_degree[dependent] -= 1
+                if in_degree[dependent] == 0:
+                    heapq.heappush(ready, (position[dependent], dependent))
+        
+        if len(ordered) != len(containers):
+            # Every container left waits on another one that is left, so following
+            # those dependencies from any of them must come back round to a cycle
+            blocked = {name for name, degree in in_degree.items() if degree}
+            path = [next(name for name in in_degree if name in blocked)]
+            seen = {}
+            while path[-1] not in seen:
+                seen[path[-1]] = len(path) - 1
+                path.append(next(dep for dep in dependencies[path[-1]] if dep in blocked))
+            # Only fatal for commands that start containers (check_dependency_cycle),
+            # stopping or destroying a config with a cycle must still work
+            self.dependency_cycle = ' -> '.join(path[seen[path[-1]]:])
+            return containers
+        
+        return ordered
+    
+    def check_dependency_cycle(self):
+        """Exit before creating or starting anything if depends_on has a cycle"""
+        if self.dependency_cycle:
+            click.echo(f"{RED}✗{NC} Circular dependency between containers: {self.dependency_cycle}")
+            sys.exit(1)
+    
+    def run_command(self, cmd, check: bool = True, input: Optional[str] = None):
+        """Run a command and return the result (input, if given, is fed to its stdin)"""
         try:
-            return subprocess.run(cmd, capture_output=True, text=True, check=check)
+            return spawn(cmd, input=input, capture_output=True, text=True, check=check)
         except subprocess.CalledProcessError as e:
             if check:
                 click.echo(f"{RED}✗{NC} Command failed: {' '.join(cmd)}")
@@ -222,6 +424,40 @@ class LXCCompose:
                 sys.exit(1)
             return e
     
+    def read_hosts(self, path: str) -> str:
+        """Read a hosts file under a shared lock using raw fd I/O
+        
+        Bytes that aren't valid UTF-8 are kept as surrogate escapes, so writing the
+        content back with write_hosts or sudo_write reproduces them exactly.
+        """
+        fd = os.open(path, os.O_RDONLY | os.O_CLOEXEC)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_SH)
+            chunks = []
+            while True:
+                chunk = os.read(fd, 65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+            return b''.join(chunks).decode('utf-8', 'surrogateescape')
+        finally:
+            os.close(fd)
+    
+    def write_hosts(self, path: str, content: str, append: bool = False):
+        """Write a hosts file under an exclusive lock using raw fd I/O"""
+        flags = os.O_WRONLY | os.O_CREAT | os.O_CLOEXEC
+        flags |= os.O_APPEND if append else 0
+        fd = os.open(path, flags, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            if not append:
+                os.ftruncate(fd, 0)
+            data = content.encode('utf-8', 'surrogateescape')
+            while data:
+                data = data[os.write(fd, data):]
+        finally:
+            os.close(fd)
+    
     def init_hosts_file(self):
         """Initialize the shared hosts file with basic entries"""
         # Create directories with sudo if needed
@@ -229,17 +465,17 @@ class LXCCompose:
             os.makedirs(SHARED_HOSTS_DIR, exist_ok=True)
         except PermissionError:
             # Try with sudo
-            subprocess.run(['sudo', 'mkdir', '-p', SHARED_HOSTS_DIR], check=True)
+            spawn(['sudo', 'mkdir', '-p', SHARED_HOSTS_DIR], check=True)
             # Set permissions so we can write to it
-            subprocess.run(['sudo', 'chmod', '755', SHARED_HOSTS_DIR], check=True)
+            spawn(['sudo', 'chmod', '755', SHARED_HOSTS_DIR], check=True)
         
         try:
             os.makedirs(DATA_DIR, exist_ok=True)
         except PermissionError:
             # Try with sudo
-            subprocess.run(['sudo', 'mkdir', '-p', DATA_DIR], check=True)
+            spawn(['sudo', 'mkdir', '-p', DATA_DIR], check=True)
             # Set permissions so we can write to it
-            subprocess.run(['sudo', 'chmod', '755', DATA_DIR], check=True)
+            spawn(['sudo', 'chmod', '755', DATA_DIR], check=True)
         
         if not os.path.exists(SHARED_HOSTS_FILE):
             try:
@@ -256,8 +492,8 @@ class LXCCompose:
 
 # Container entries
 """
-                subprocess.run(['sudo', 'bash', '-c', f'echo "{content}" > {SHARED_HOSTS_FILE}'], check=True)
-                subprocess.run(['sudo', 'chmod', '644', SHARED_HOSTS_FILE], check=True)
+                sudo_write(SHARED_HOSTS_FILE, f'{content}\n')
+                spawn(['sudo', 'chmod', '644', SHARED_HOSTS_FILE], check=True)
     
     def update_host_machine_hosts(self, action: str, name: str, ip: str = None):
         """Add or remove entry from host machine's /etc/hosts"""
@@ -268,8 +504,7 @@ class LXCCompose:
         if action == "add" and ip:
             # Read current hosts file
             try:
-                with open(hosts_file, 'r') as f:
-                    content = f.read()
+                content = self.read_hosts(hosts_file)
             except:
                 content = ""
             
@@ -277,7 +512,7 @@ class LXCCompose:
             if marker_start not in content:
                 # Add our section at the end
                 new_section = f"\n{marker_start}\n{ip}\t{name}\n{marker_end}\n"
-                subprocess.run(['sudo', 'bash', '-c', f'echo "{new_section}" >> {hosts_file}'], check=True)
+                sudo_write(hosts_file, f'{new_section}\n', append=True)
             else:
                 # Update existing section
                 lines = content.split('\n')
@@ -308,15 +543,14 @@ class LXCCompose:
                 
                 # Write back
                 new_content = '\n'.join(new_lines)
-                subprocess.run(['sudo', 'bash', '-c', f'cat > {hosts_file} << "EOF"\n{new_content}\nEOF'], check=True)
+                sudo_write(hosts_file, f'{new_content}\n')
             
             click.echo(f"  Added {name} ({ip}) to host machine's /etc/hosts")
             
         elif action == "remove":
             # Remove entry from host machine's hosts file
             try:
-                with open(hosts_file, 'r') as f:
-                    lines = f.readlines()
+                lines = self.read_hosts(hosts_file).splitlines(keepends=True)
             except:
                 return
             
@@ -338,36 +572,33 @@ class LXCCompose:
             
             # Write back
             new_content = ''.join(new_lines)
-            subprocess.run(['sudo', 'bash', '-c', f'cat > {hosts_file} << "EOF"\n{new_content}EOF'], check=True)
+            sudo_write(hosts_file, new_content)
     
     def update_hosts_file(self, action: str, name: str, ip: str = None):
         """Add or remove entry from shared hosts file"""
         if action == "add" and ip:
             # Check if entry already exists
             try:
-                with open(SHARED_HOSTS_FILE, 'r') as f:
-                    existing = f.read()
-                    if f"{ip}\t{name}" in existing or f" {name}\n" in existing:
-                        return  # Already exists
+                existing = self.read_hosts(SHARED_HOSTS_FILE)
+                if f"{ip}\t{name}" in existing or f" {name}\n" in existing:
+                    return  # Already exists
             except FileNotFoundError:
                 # File doesn't exist yet, that's ok
                 existing = ""
             
             # Add new entry
             try:
-                with open(SHARED_HOSTS_FILE, 'a') as f:
-                    f.write(f"{ip}\t{name}\n")
+                self.write_hosts(SHARED_HOSTS_FILE, f"{ip}\t{name}\n", append=True)
             except PermissionError:
                 # Use sudo to append
-                subprocess.run(['sudo', 'bash', '-c', f'echo "{ip}\t{name}" >> {SHARED_HOSTS_FILE}'], check=True)
+                sudo_write(SHARED_HOSTS_FILE, f'{ip}\t{name}\n', append=True)
             click.echo(f"  Added {name} ({ip}) to hosts file")
             
         elif action == "remove":
             # Remove entry containing the container name
             if os.path.exists(SHARED_HOSTS_FILE):
                 try:
-                    with open(SHARED_HOSTS_FILE, 'r') as f:
-                        lines = f.readlines()
+                    lines = self.read_hosts(SHARED_HOSTS_FILE).splitlines(keepends=True)
                     
                     # Filter out lines with this container name
                     new_lines = []
@@ -377,11 +608,11 @@ class LXCCompose:
                             continue
                         new_lines.append(line)
                     
-                    with open(SHARED_HOSTS_FILE, 'w') as f:
-                        f.writelines(new_lines)
+                    self.write_hosts(SHARED_HOSTS_FILE, ''.join(new_lines))
                 except PermissionError:
                     # Read with cat, filter, and write back with sudo
-                    result = subprocess.run(['cat', SHARED_HOSTS_FILE], capture_output=True, text=True)
+                    result = spawn(['cat', SHARED_HOSTS_FILE], capture_output=True, text=True,
+                                   encoding='utf-8', errors='surrogateescape')
                     lines = result.stdout.splitlines(keepends=True)
                     
                     # Filter out lines with this container name
@@ -394,13 +625,19 @@ class LXCCompose:
                     
                     # Write back with sudo
                     content = ''.join(new_lines)
-                    subprocess.run(['sudo', 'bash', '-c', f'echo "{content}" > {SHARED_HOSTS_FILE}'], check=True)
+                    sudo_write(SHARED_HOSTS_FILE, f'{content}\n')
+    
+    def get_device_names(self, name: str) -> set:
+        """Get the names of the devices configured on a container"""
+        result = self.run_command(['lxc', 'config', 'device', 'show', name], check=False)
+        if result.returncode != 0:
+            return set()
+        return set(DEVICE_NAME_RE.findall(result.stdout))
     
     def mount_hosts_file(self, name: str):
         """Mount the shared hosts file into the container"""
         # Check if device already exists
-        result = self.run_command(['lxc', 'config', 'device', 'show', name], check=False)
-        if result.returncode == 0 and 'hosts:' in result.stdout:
+        if 'hosts' in self.get_device_names(name):
             click.echo(f"  Hosts file already mounted")
             return
         
@@ -411,13 +648,12 @@ class LXCCompose:
     
     def mount_env_file(self, name: str):
         """Mount the .env file into the container if it exists"""
-        config_dir = os.path.dirname(os.path.abspath(self.config_file))
-        env_file = os.path.join(config_dir, DEFAULT_ENV_FILE)
+        # Existence was checked once when the .env file was loaded
+        env_file = self.env_file
         
-        if os.path.exists(env_file):
+        if env_file:
             # Check if device already exists
-            result = self.run_command(['lxc', 'config', 'device', 'show', name], check=False)
-            if result.returncode == 0 and 'envfile:' in result.stdout:
+            if 'envfile' in self.get_device_names(name):
                 click.echo(f"  .env file already mounted")
                 return
             
@@ -440,8 +676,8 @@ class LXCCompose:
         
         if env_content:
             # Write to /etc/environment
-            self.run_command(['lxc', 'exec', name, '--', 'sh', '-c',
-                            f'echo \'{env_content}\' >> /etc/environment'])
+            self.run_command(['lxc', 'exec', name, '--', 'tee', '-a', '/etc/environment'],
+                             input=f'{env_content}\n')
             
             # Also create a profile.d script for shell environments
             profile_script = "#!/bin/sh\n"
@@ -450,7 +686,8 @@ class LXCCompose:
                 profile_script += f'export {key}="{value}"\n'
             
             self.run_command(['lxc', 'exec', name, '--', 'sh', '-c',
-                            f'echo \'{profile_script}\' > /etc/profile.d/lxc-compose.sh && chmod +x /etc/profile.d/lxc-compose.sh'])
+                              'cat > /etc/profile.d/lxc-compose.sh && chmod +x /etc/profile.d/lxc-compose.sh'],
+                             input=f'{profile_script}\n')
     
     def get_next_available_port(self, preferred_port, used_ports=None):
         """Find next available port for forwarding
@@ -508,9 +745,8 @@ class LXCCompose:
         if not ports:
             return
             
-        # Check if UPF is installed
-        upf_check = self.run_command(['which', 'upf'], check=False)
-        if upf_check.returncode != 0:
+        # Check if UPF is installed (PATH lookup, no subprocess)
+        if not shutil.which('upf'):
             click.echo(f"  {YELLOW}Warning: UPF not installed, skipping port forwarding{NC}")
             return
         
@@ -590,14 +826,13 @@ class LXCCompose:
             except (PermissionError, OSError):
                 # Use sudo to write
                 content = json.dumps(port_mappings, indent=2)
-                subprocess.run(['sudo', 'mkdir', '-p', os.path.dirname(PORT_MAPPINGS_FILE)], check=True)
-                subprocess.run(['sudo', 'bash', '-c', f"echo '{content}' > {PORT_MAPPINGS_FILE}"], check=True)
+                spawn(['sudo', 'mkdir', '-p', os.path.dirname(PORT_MAPPINGS_FILE)], check=True)
+                sudo_write(PORT_MAPPINGS_FILE, f'{content}\n')
     
     def remove_port_forwarding(self, name: str):
         """Remove UPF port forwarding rules for a container"""
-        # Check if UPF is installed
-        upf_check = self.run_command(['which', 'upf'], check=False)
-        if upf_check.returncode != 0:
+        # Check if UPF is installed (PATH lookup, no subprocess)
+        if not shutil.which('upf'):
             return
         
         # Get current UPF rules
@@ -616,31 +851,37 @@ class LXCCompose:
             except json.JSONDecodeError:
                 pass
     
+    def apply_filter_rules(self, rules: List[str]) -> subprocess.CompletedProcess:
+        """Apply iptables filter table commands (e.g. '-A FORWARD ...') in one iptables-restore"""
+        # --noflush keeps existing rules, the batch is committed atomically
+        content = '*filter\n' + ''.join(f'{rule}\n' for rule in rules) + 'COMMIT\n'
+        return spawn(['sudo', 'iptables-restore', '--noflush'],
+                     input=content, capture_output=True, text=True)
+    
     def manage_exposed_ports(self, action: str, ip: str, ports: List[int], name: str = None):
         """Add or remove iptables rules for exposed ports and setup UPF forwarding"""
         if action == "add" and ports:
             click.echo(f"  Setting up exposed ports: {ports}")
             
-            # Setup firewall rules
+            # Setup firewall rules (applied together in a single iptables-restore)
             # Allow established connections
-            self.run_command(['sudo', 'iptables', '-A', 'FORWARD',
-                            '-d', ip, '-m', 'state', '--state',
-                            'ESTABLISHED,RELATED', '-j', 'ACCEPT'], check=False)
+            rules = [f'-A FORWARD -d {ip} -m state --state ESTABLISHED,RELATED -j ACCEPT']
             
             # Allow each exposed port
-            for port in ports:
-                self.run_command(['sudo', 'iptables', '-A', 'FORWARD',
-                                '-d', ip, '-p', 'tcp', '--dport', str(port),
-                                '-j', 'ACCEPT'], check=False)
-                click.echo(f"    Exposed port {port}")
+            rules += [f'-A FORWARD -d {ip} -p tcp --dport {port} -j ACCEPT' for port in ports]
             
             # Allow container to initiate outbound connections
-            self.run_command(['sudo', 'iptables', '-A', 'FORWARD',
-                            '-s', ip, '-j', 'ACCEPT'], check=False)
+            rules.append(f'-A FORWARD -s {ip} -j ACCEPT')
             
             # Drop all other inbound traffic to this container
-            self.run_command(['sudo', 'iptables', '-A', 'FORWARD',
-                            '-d', ip, '-j', 'DROP'], check=False)
+            rules.append(f'-A FORWARD -d {ip} -j DROP')
+            
+            result = self.apply_filter_rules(rules)
+            if result.returncode == 0:
+                for port in ports:
+                    click.echo(f"    Exposed port {port}")
+            else:
+                click.echo(f"    {YELLOW}Warning: Failed to apply firewall rules: {result.stderr.strip()}{NC}")
             
             # Setup UPF port forwarding if container name is provided
             if name:
@@ -654,21 +895,14 @@ class LXCCompose:
                                      '--line-numbers', '-n'], check=False)
             
             if result.returncode == 0:
-                # Parse rules and find ones with our IP
-                lines = result.stdout.split('\n')
-                rules_to_remove = []
+                # Find rule numbers of lines that reference our IP (exact address match)
+                rule_re = re.compile(rf'(?m)^(\d+)\s.*(?<![\d.]){re.escape(ip)}(?![\d.])')
+                rules_to_remove = [int(num) for num in rule_re.findall(result.stdout)]
                 
-                for line in lines:
-                    if ip in line:
-                        # Extract rule number
-                        match = re.match(r'^(\d+)', line)
-                        if match:
-                            rules_to_remove.append(int(match.group(1)))
-                
-                # Remove rules in reverse order (highest number first)
-                for rule_num in sorted(rules_to_remove, reverse=True):
-                    self.run_command(['sudo', 'iptables', '-D', 'FORWARD',
-                                    str(rule_num)], check=False)
+                # Remove rules in reverse order (highest number first), all in one batch
+                if rules_to_remove:
+                    self.apply_filter_rules([f'-D FORWARD {rule_num}'
+                                             for rule_num in sorted(rules_to_remove, reverse=True)])
     
     def save_container_ip(self, name: str, ip: str, ports: List[int] = None):
         """Save container IP for persistence and future reuse"""
@@ -699,49 +933,43 @@ class LXCCompose:
         except (PermissionError, OSError):
             # Use sudo to create directory and write file
             content = json.dumps(data, indent=2)
-            subprocess.run(['sudo', 'mkdir', '-p', os.path.dirname(CONTAINER_METADATA_FILE)], check=True)
-            subprocess.run(['sudo', 'bash', '-c', f"echo '{content}' > {CONTAINER_METADATA_FILE}"], check=True)
-            subprocess.run(['sudo', 'chmod', '666', CONTAINER_METADATA_FILE], check=True)
+            spawn(['sudo', 'mkdir', '-p', os.path.dirname(CONTAINER_METADATA_FILE)], check=True)
+            sudo_write(CONTAINER_METADATA_FILE, f'{content}\n')
+            spawn(['sudo', 'chmod', '666', CONTAINER_METADATA_FILE], check=True)
     
-    def get_saved_container_ip(self, name: str) -> Optional[str]:
-        """Get saved container IP"""
+    def load_container_metadata(self) -> Dict:
+        """Load the saved metadata (IPs, ports) for all containers"""
         if os.path.exists(CONTAINER_METADATA_FILE):
             try:
                 with open(CONTAINER_METADATA_FILE, 'r') as f:
-                    data = json.load(f)
-                    container_info = data.get(name)
-                    if isinstance(container_info, dict):
-                        return container_info.get('ip')
-                    # Handle old format (just IP string)
-                    return container_info
+                    return json.load(f)
             except PermissionError:
                 # Read with sudo
-                result = subprocess.run(['sudo', 'cat', CONTAINER_METADATA_FILE], capture_output=True, text=True)
+                result = spawn(['sudo', 'cat', CONTAINER_METADATA_FILE], capture_output=True, text=True)
                 if result.returncode == 0:
-                    data = json.loads(result.stdout)
-                    container_info = data.get(name)
-                    if isinstance(container_info, dict):
-                        return container_info.get('ip')
-                    return container_info
-        return None
+                    return json.loads(result.stdout)
+        return {}
     
-    def get_saved_container_ports(self, name: str) -> List[int]:
-        """Get saved container exposed ports"""
-        if os.path.exists(CONTAINER_METADATA_FILE):
-            try:
-                with open(CONTAINER_METADATA_FILE, 'r') as f:
-                    data = json.load(f)
-                    container_info = data.get(name)
-                    if isinstance(container_info, dict):
-                        return container_info.get('ports', [])
-            except PermissionError:
-                # Read with sudo
-                result = subprocess.run(['sudo', 'cat', CONTAINER_METADATA_FILE], capture_output=True, text=True)
-                if result.returncode == 0:
-                    data = json.loads(result.stdout)
-                    container_info = data.get(name)
-                    if isinstance(container_info, dict):
-                        return container_info.get('ports', [])
+    def get_saved_container_ip(self, name: str) -> Optional[str]:
+        """Get saved container IP"""
+        container_info = self.load_container_metadata().get(name)
+        if isinstance(container_info, dict):
+            return container_info.get('ip')
+        # Handle old format (just IP string)
+        return container_info
+    
+    def get_saved_container_ports(self, name: str, metadata: Dict = None) -> List[int]:
+        """Get saved container exposed ports
+        
+        Args:
+            name: Container name
+            metadata: Already loaded container metadata (loaded from disk if not provided)
+        """
+        if metadata is None:
+            metadata = self.load_container_metadata()
+        container_info = metadata.get(name)
+        if isinstance(container_info, dict):
+            return container_info.get('ports', [])
         return []
     
     def remove_saved_container_ip(self, name: str):
@@ -752,30 +980,42 @@ class LXCCompose:
     
     def get_all_containers(self) -> List[str]:
         """Get all containers on the system"""
-        result = self.run_command(['lxc', 'list', '--format=json'], check=False)
-        if result.returncode != 0:
-            return []
-        containers = json.loads(result.stdout)
-        return [c['name'] for c in containers]
+        return list(self.get_container_states())
     
-    def container_exists(self, name: str) -> bool:
-        """Check if container exists"""
-        result = self.run_command(['lxc', 'list', f'^{name}$', '--format=json'], check=False)
-        if result.returncode != 0:
-            return False
-        containers = json.loads(result.stdout)
-        return len(containers) > 0
-    
-    def container_running(self, name: str) -> bool:
-        """Check if container is running"""
-        result = self.run_command(['lxc', 'list', f'^{name}$', '--format=json'], check=False)
+    def get_container_states(self) -> Dict[str, str]:
+        """Get the status of every container on the system with a single lxc call"""
+        # Name and state columns only, so LXD doesn't gather each container's network state
+        result = self.run_command(['lxc', 'list', '--columns=ns', '--format=csv'], check=False)
         if result.returncode != 0:
-            return False
-        containers = json.loads(result.stdout)
-        return len(containers) > 0 and containers[0].get('status') == 'Running'
+            return {}
+        states = {}
+        for line in result.stdout.splitlines():
+            name, _, state = line.partition(',')
+            if name:
+                # CSV reports e.g. RUNNING, normalise to the JSON style status (Running)
+                states[name] = state.capitalize() or 'Unknown'
+        return states
+    
+    def run_parallel(self, func, names: List[str]):
+        """Run func(name) for each container concurrently, yielding (name, result) as they finish"""
+        # Imported here so single-container commands don't pay for the thread pool machinery
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+        workers = max(1, min(len(names), MAX_PARALLEL_OPERATIONS))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(func, name): name for name in names}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
     
     def get_container_ip(self, name: str) -> Optional[str]:
         """Get container IP address"""
+        if self.query_instance_state:
+            # Query only this instance's state: 'lxc list' with a name filter can gather
+            # the runtime state of every container before filtering, on each poll
+            result = self.run_command(['lxc', 'query', f'/1.0/instances/{name}/state'], check=False)
+            if result.returncode == 0:
+                return self.extract_container_ip({'state': json.loads(result.stdout)})
+        
+        # The raw query only sees the default project, 'lxc list' applies the current one
         result = self.run_command(['lxc', 'list', f'^{name}$', '--format=json'], check=False)
         if result.returncode != 0:
             return None
@@ -784,7 +1024,13 @@ class LXCCompose:
         if not containers:
             return None
         
-        container = containers[0]
+        # The container exists but the query missed it, so use 'lxc list' from now on
+        self.query_instance_state = False
+        return self.extract_container_ip(containers[0])
+    
+    @staticmethod
+    def extract_container_ip(container: Dict) -> Optional[str]:
+        """Get the IPv4 address from an 'lxc list --format=json' entry"""
         if container.get('state', {}).get('network'):
             for iface, details in container['state']['network'].items():
                 if iface != 'lo' and details.get('addresses'):
@@ -796,19 +1042,23 @@ class LXCCompose:
     def wait_for_network(self, name: str, timeout: int = 60) -> Optional[str]:
         """Wait for container to get network and return IP"""
         click.echo(f"  Waiting for network...")
-        start = time.time()
-        while time.time() - start < timeout:
+        deadline = time.monotonic() + timeout
+        # Poll quickly at first (DHCP usually answers within a second), backing off to 2s
+        delay = 0.1
+        while time.monotonic() < deadline:
             ip = self.get_container_ip(name)
             if ip:
                 click.echo(f"  Got IP: {ip}")
                 return ip
-            time.sleep(2)
+            time.sleep(delay)
+            delay = min(delay * 2, 2)
         return None
     
-    def setup_container_networking(self, name: str, exposed_ports: List[int]):
-        """Setup both hosts file and iptables rules"""
+    def setup_container_networking(self, name: str, exposed_ports: List[int], ip: Optional[str] = None):
+        """Setup both hosts file and iptables rules (ip is looked up if not already known)"""
         # Get container IP
-        ip = self.get_container_ip(name)
+        if not ip:
+            ip = self.get_container_ip(name)
         if not ip:
             click.echo(f"  {YELLOW}Warning: Could not get container IP{NC}")
             return
@@ -861,6 +1111,11 @@ class LXCCompose:
         # Remove saved IP
         self.remove_saved_container_ip(name)
     
+    @staticmethod
+    def csv_first_column(output: str) -> set:
+        """Get the set of first-column values from lxc --format=csv output"""
+        return {line.split(',', 1)[0] for line in output.splitlines() if line}
+    
     def try_assign_static_ip(self, name: str, preferred_ip: str) -> bool:
         """Try to assign a static IP to a container"""
         # Get the default network (usually lxdbr0)
@@ -869,9 +1124,10 @@ class LXCCompose:
             return False
         
         network = None
-        for line in result.stdout.strip().split('\n'):
-            if line and 'bridge' in line:
-                network = line.split(',')[0]
+        for line in result.stdout.splitlines():
+            fields = line.split(',')
+            if len(fields) > 1 and fields[1] == 'bridge':
+                network = fields[0]
                 break
         
         if not network:
@@ -904,8 +1160,8 @@ class LXCCompose:
         # Check if storage pool exists before creating container
         storage_check = self.run_command(['lxc', 'storage', 'list', '--format=csv'], check=False)
         if storage_check.returncode == 0:
-            # Check if 'default' storage pool exists
-            if 'default,' not in storage_check.stdout:
+            # Check if 'default' storage pool exists (first CSV column is the pool name)
+            if 'default' not in self.csv_first_column(storage_check.stdout):
                 click.echo(f"  {YELLOW}⚠ No default storage pool found. Creating...{NC}")
                 # Try to create storage pool, suppressing YAML errors
                 create_result = self.run_command(['lxc', 'storage', 'create', 'default', 'dir'], check=False)
@@ -915,7 +1171,7 @@ class LXCCompose:
                 
                 # Verify it was created
                 verify = self.run_command(['lxc', 'storage', 'list', '--format=csv'], check=False)
-                if 'default,' in verify.stdout:
+                if 'default' in self.csv_first_column(verify.stdout):
                     click.echo(f"  {GREEN}✓ Storage pool created{NC}")
                     # Also ensure default profile has root disk
                     self.run_command(['lxc', 'profile', 'device', 'add', 'default', 'root', 
@@ -966,7 +1222,7 @@ class LXCCompose:
                 exposed_ports = [exposed_ports]
         
         if ip:
-            self.setup_container_networking(name, exposed_ports)
+            self.setup_container_networking(name, exposed_ports, ip)
         
         # Setup mounts
         if 'mounts' in container:
@@ -1003,10 +1259,7 @@ class LXCCompose:
             click.echo(f"  Mounting library tests from {test_dir}...")
             
             # Check if device already exists
-            result = self.run_command(['lxc', 'config', 'device', 'show', name], check=False)
-            existing_devices = result.stdout if result.returncode == 0 else ""
-            
-            if 'library-tests:' not in existing_devices:
+            if 'library-tests' not in self.get_device_names(name):
                 # Mount the library tests directory to /tests in the container
                 self.run_command(['lxc', 'config', 'device', 'add', name, 'library-tests',
                                 'disk', f'source={test_dir}', 'path=/tests', 'shift=true'])
@@ -1016,18 +1269,14 @@ class LXCCompose:
         """Setup container mounts"""
         click.echo(f"  Setting up mounts...")
         
-        config_dir = os.path.dirname(os.path.abspath(self.config_file))
-        
         # Get existing devices
-        result = self.run_command(['lxc', 'config', 'device', 'show', name], check=False)
-        existing_devices = result.stdout if result.returncode == 0 else ""
+        existing_devices = self.get_device_names(name)
         
         for mount in mounts:
             if isinstance(mount, str):
                 # Simple format: "./path:/container/path"
-                if ':' in mount:
-                    source, target = mount.split(':', 1)
-                else:
+                source, sep, target = mount.partition(':')
+                if not sep:
                     continue
             elif isinstance(mount, dict):
                 # Dictionary format: {source: path, target: path}
@@ -1039,7 +1288,7 @@ class LXCCompose:
             # Expand and resolve paths
             source = os.path.expanduser(source)
             if not os.path.isabs(source):
-                source = os.path.join(config_dir, source)
+                source = os.path.join(self.config_dir, source)
             source = os.path.abspath(source)
             
             # Create source directory if it doesn't exist
@@ -1051,7 +1300,7 @@ class LXCCompose:
             device_name = target.replace('/', '-').strip('-') or 'root'
             
             # Check if device already exists
-            if f'{device_name}:' in existing_devices:
+            if device_name in existing_devices:
                 click.echo(f"    Mount already exists: {source} -> {target}")
                 continue
             
@@ -1097,8 +1346,8 @@ class LXCCompose:
                 click.echo(f"    Trying alternative mirror: {mirror}")
                 # Update sources.list to use alternative mirror
                 self.run_command(
-                    ['lxc', 'exec', name, '--', 'sh', '-c',
-                     f"sed -i.bak 's|http://[^ ]*|{mirror.rstrip('/')}|g' /etc/apt/sources.list"],
+                    ['lxc', 'exec', name, '--', 'sed', '-i.bak',
+                     f"s|http://[^ ]*|{mirror.rstrip('/')}|g", '/etc/apt/sources.list'],
                     check=False
                 )
             
@@ -1106,8 +1355,7 @@ class LXCCompose:
                 try:
                     # Update package index with timeout
                     update_result = self.run_command(
-                        ['lxc', 'exec', name, '--', 'sh', '-c',
-                         'timeout 60 apt-get update'],
+                        ['lxc', 'exec', name, '--', 'timeout', '60', 'apt-get', 'update'],
                         check=False
                     )
                     
@@ -1116,8 +1364,8 @@ class LXCCompose:
                     
                     # Install packages
                     install_result = self.run_command(
-                        ['lxc', 'exec', name, '--', 'sh', '-c',
-                         f'DEBIAN_FRONTEND=noninteractive timeout 120 apt-get install -y {" ".join(packages)}'],
+                        ['lxc', 'exec', name, '--env', 'DEBIAN_FRONTEND=noninteractive', '--',
+                         'timeout', '120', 'apt-get', 'install', '-y', *packages],
                         check=False
                     )
                     
@@ -1151,9 +1399,9 @@ class LXCCompose:
         )
         alpine_version = "v3.19"  # Default
         if version_result.returncode == 0 and version_result.stdout:
-            parts = version_result.stdout.strip().split('.')
-            if len(parts) >= 2:
-                alpine_version = f"v{parts[0]}.{parts[1]}"
+            major, sep, rest = version_result.stdout.strip().partition('.')
+            if sep:
+                alpine_version = f"v{major}.{rest.partition('.')[0]}"
         
         # List of Alpine mirrors to try (ordered by reliability)
         # Try HTTP first as some environments have HTTPS issues
@@ -1183,9 +1431,8 @@ class LXCCompose:
             for attempt in range(max_retries):
                 try:
                     # Update package index with timeout and retry
-                    update_cmd = 'timeout 30 apk update 2>&1'
                     update_result = self.run_command(
-                        ['lxc', 'exec', name, '--', 'sh', '-c', update_cmd],
+                        ['lxc', 'exec', name, '--', 'timeout', '30', 'apk', 'update'],
                         check=False
                     )
                     
@@ -1206,9 +1453,8 @@ class LXCCompose:
                             raise Exception(f"apk update failed: {output[:200]}")
                     
                     # If update succeeded, install packages
-                    install_cmd = f'timeout 120 apk add --no-cache {" ".join(packages)}'
                     install_result = self.run_command(
-                        ['lxc', 'exec', name, '--', 'sh', '-c', install_cmd],
+                        ['lxc', 'exec', name, '--', 'timeout', '120', 'apk', 'add', '--no-cache', *packages],
                         check=False
                     )
                     
@@ -1267,20 +1513,18 @@ class LXCCompose:
         """Setup services by generating supervisor configs"""
         click.echo(f"  Setting up services...")
         
-        # Detect the correct supervisor config directory based on OS
-        # Check if it's Ubuntu/Debian (uses /etc/supervisor/conf.d/)
-        systemctl_check = self.run_command(['lxc', 'exec', name, '--', 'which', 'systemctl'], check=False)
-        if systemctl_check.returncode == 0:
-            # Ubuntu/Debian use /etc/supervisor/conf.d/
-            config_dir = '/etc/supervisor/conf.d'
-            config_ext = '.conf'
-        else:
-            # Alpine uses /etc/supervisor.d/
-            config_dir = '/etc/supervisor.d'
-            config_ext = '.ini'
-        
-        # Create the appropriate directory if it doesn't exist
-        self.run_command(['lxc', 'exec', name, '--', 'mkdir', '-p', config_dir], check=False)
+        # All configs and the supervisor auto-start go to the container as one
+        # script, so the whole setup is a single lxc exec session
+        script = [
+            'set -e',
+            # Ubuntu/Debian (systemd) use /etc/supervisor/conf.d/, Alpine uses /etc/supervisor.d/
+            'if command -v systemctl >/dev/null 2>&1; then',
+            '    config_dir=/etc/supervisor/conf.d config_ext=.conf',
+            'else',
+            '    config_dir=/etc/supervisor.d config_ext=.ini',
+            'fi',
+            'mkdir -p "$config_dir"',
+        ]
         
         for service_name, service_config in services.items():
             click.echo(f"    Creating supervisor config for {service_name}...")
@@ -1307,57 +1551,42 @@ class LXCCompose:
                 env_list = ','.join([f'{k}="{v}"' for k, v in self.env_vars.items()])
                 ini_content += f"environment={env_list}\n"
             
-            # Write the config file to the container
-            config_path = f"{config_dir}/{service_name}{config_ext}"
-            escaped_content = ini_content.replace("'", "'\\''")
-            self.run_command(['lxc', 'exec', name, '--', 'sh', '-c', 
-                            f"echo '{escaped_content}' > {config_path}"])
+            # Write the config file (quoted heredoc, so nothing in it is expanded)
+            script.append(f'cat > "$config_dir/{service_name}$config_ext" <<\'LXC_COMPOSE_EOF\'\n'
+                          f'{ini_content}LXC_COMPOSE_EOF')
         
-        # Enable supervisor to start at boot
-        self.enable_supervisor_autostart(name)
-    
-    def enable_supervisor_autostart(self, name: str):
-        """Enable supervisor to start automatically at boot"""
+        # Enable supervisor to start at boot (failures here are not fatal)
         click.echo(f"    Enabling supervisor auto-start...")
+        script += ['set +e', SUPERVISOR_AUTOSTART_SCRIPT, 'exit 0']
         
-        # First, detect the init system
-        # Check for systemd
-        systemctl_check = self.run_command(['lxc', 'exec', name, '--', 'which', 'systemctl'], check=False)
-        if systemctl_check.returncode == 0:
-            # Systemd-based system (Ubuntu, Debian, etc.)
-            # Enable and start supervisor service
-            self.run_command(['lxc', 'exec', name, '--', 'systemctl', 'enable', 'supervisor'], check=False)
-            self.run_command(['lxc', 'exec', name, '--', 'systemctl', 'start', 'supervisor'], check=False)
-        else:
-            # Check for OpenRC (Alpine)
-            rc_update_check = self.run_command(['lxc', 'exec', name, '--', 'which', 'rc-update'], check=False)
-            if rc_update_check.returncode == 0:
-                # OpenRC-based system (Alpine)
-                # Add supervisord to default runlevel
-                self.run_command(['lxc', 'exec', name, '--', 'rc-update', 'add', 'supervisord', 'default'], check=False)
-                # Start supervisord service
-                self.run_command(['lxc', 'exec', name, '--', 'rc-service', 'supervisord', 'start'], check=False)
-            else:
-                # Fallback: just start supervisord directly
-                self.run_command(['lxc', 'exec', name, '--', 'supervisord', '-c', '/etc/supervisord.conf'], check=False)
+        self.run_command(['lxc', 'exec', name, '--', 'sh', '-s'], input='\n'.join(script) + '\n')
     
-    def handle_dependencies(self, container: Dict):
-        """Handle container dependencies"""
-        if 'depends_on' not in container:
+    def handle_dependencies(self, container: Dict, states: Optional[Dict[str, str]] = None):
+        """Handle container dependencies
+        
+        states is the name -> status map from get_container_states(); it is
+        fetched if not given and kept up to date as dependencies are started.
+        """
+        deps = container.get('depends_on')
+        if not deps:
             return
-            
-        deps = container['depends_on']
+        
         if isinstance(deps, str):
             deps = [deps]
         
+        if states is None:
+            states = self.get_container_states()
+        
         for dep in deps:
-            if not self.container_exists(dep):
+            status = states.get(dep)
+            if status is None:
                 click.echo(f"  {YELLOW}Warning: Dependency {dep} doesn't exist{NC}")
                 continue
                 
-            if not self.container_running(dep):
+            if status != 'Running':
                 click.echo(f"  Starting dependency: {dep}")
                 self.run_command(['lxc', 'start', dep])
+                states[dep] = 'Running'
                 
                 # Wait for network and setup networking if needed
                 ip = self.wait_for_network(dep, timeout=30)
@@ -1372,20 +1601,24 @@ class LXCCompose:
             click.echo(f"{RED}Cannot use --all with launch command{NC}")
             sys.exit(1)
         
+        self.check_dependency_cycle()
         click.echo(f"{BOLD}Creating containers from {self.config_file}...{NC}")
         
+        # Container states are listed once and kept current for the whole run
+        states = self.get_container_states()
         for container in self.containers:
             name = container['name']
             click.echo(f"\n{BLUE}Container: {name}{NC}")
             
             # Handle dependencies
-            self.handle_dependencies(container)
+            self.handle_dependencies(container, states)
             
-            if self.container_exists(name):
+            if name in states:
                 click.echo(f"  {RED}✗ Container already exists{NC}")
                 sys.exit(1)
             else:
                 self.create_container(container)
+                states[name] = 'Running'
         
         click.echo(f"\n{GREEN}✓{NC} All containers created and started")
     
@@ -1393,36 +1626,52 @@ class LXCCompose:
         """Start existing containers (error if doesn't exist)"""
         if self.all_containers:
             click.echo(f"{BOLD}Starting all containers on system...{NC}")
-            containers = self.get_all_containers()
-            if not containers:
+            states = self.get_container_states()
+            if not states:
                 click.echo(f"{YELLOW}No containers found on system{NC}")
                 return
-                
-            for name in containers:
-                if not self.container_running(name):
-                    click.echo(f"Starting {name}...")
-                    self.run_command(['lxc', 'start', name])
-                else:
+            
+            for name, status in states.items():
+                if status == 'Running':
                     click.echo(f"Container {name} already running")
+            
+            def start_one(name):
+                return self.run_command(['lxc', 'start', name], check=False)
+            
+            failed = False
+            stopped = [name for name, status in states.items() if status != 'Running']
+            for name, result in self.run_parallel(start_one, stopped):
+                if result.returncode == 0:
+                    click.echo(f"Started {name}")
+                else:
+                    click.echo(f"{RED}✗{NC} Failed to start {name}: {result.stderr.strip()}")
+                    failed = True
+            if failed:
+                sys.exit(1)
         else:
+            self.check_dependency_cycle()
             click.echo(f"{BOLD}Starting containers from {self.config_file}...{NC}")
             
+            # Container states are listed once and kept current for the whole run
+            states = self.get_container_states()
             for container in self.containers:
                 name = container['name']
                 click.echo(f"\n{BLUE}Container: {name}{NC}")
                 
                 # Handle dependencies
-                self.handle_dependencies(container)
+                self.handle_dependencies(container, states)
                 
-                if not self.container_exists(name):
+                status = states.get(name)
+                if status is None:
                     click.echo(f"  {RED}✗ Container doesn't exist{NC}")
                     sys.exit(1)
                 
-                if self.container_running(name):
+                if status == 'Running':
                     click.echo(f"  Already running")
                 else:
                     click.echo(f"  Starting...")
                     self.run_command(['lxc', 'start', name])
+                    states[name] = 'Running'
                     
                     # Wait for network
                     ip = self.wait_for_network(name)
@@ -1445,21 +1694,26 @@ class LXCCompose:
             # For --all, just start existing containers
             self.start()
         else:
+            self.check_dependency_cycle()
             click.echo(f"{BOLD}Bringing up containers from {self.config_file}...{NC}")
             
+            # Container states are listed once and kept current for the whole run
+            states = self.get_container_states()
             for container in self.containers:
                 name = container['name']
                 click.echo(f"\n{BLUE}Container: {name}{NC}")
                 
                 # Handle dependencies
-                self.handle_dependencies(container)
+                self.handle_dependencies(container, states)
                 
-                if self.container_exists(name):
-                    if self.container_running(name):
+                status = states.get(name)
+                if status is not None:
+                    if status == 'Running':
                         click.echo(f"  Already running")
                     else:
                         click.echo(f"  Starting existing container...")
                         self.run_command(['lxc', 'start', name])
+                        states[name] = 'Running'
                         
                         # Wait for network
                         ip = self.wait_for_network(name)
@@ -1482,6 +1736,7 @@ class LXCCompose:
                 else:
                     click.echo(f"  Creating new container...")
                     self.create_container(container)
+                    states[name] = 'Running'
             
             click.echo(f"\n{GREEN}✓{NC} All containers are up")
     
@@ -1489,28 +1744,75 @@ class LXCCompose:
         """Stop containers"""
         if self.all_containers:
             click.echo(f"{BOLD}Stopping all containers on system...{NC}")
-            containers = self.get_all_containers()
-            if not containers:
+            states = self.get_container_states()
+            if not states:
                 click.echo(f"{YELLOW}No containers found on system{NC}")
                 return
-                
-            for name in containers:
-                if self.container_running(name):
-                    click.echo(f"Stopping {name}...")
-                    self.run_command(['lxc', 'stop', name])
-                else:
+            
+            for name, status in states.items():
+                if status != 'Running':
                     click.echo(f"Container {name} already stopped")
+            
+            def stop_one(name):
+                return self.run_command(['lxc', 'stop', name], check=False)
+            
+            failed = False
+            running = [name for name, status in states.items() if status == 'Running']
+            for name, result in self.run_parallel(stop_one, running):
+                if result.returncode == 0:
+                    click.echo(f"Stopped {name}")
+                else:
+                    click.echo(f"{RED}✗{NC} Failed to stop {name}: {result.stderr.strip()}")
+                    failed = True
+            if failed:
+                sys.exit(1)
         else:
             click.echo(f"{BOLD}Stopping containers from {self.config_file}...{NC}")
             
+            states = self.get_container_states()
             for container in self.containers:
-                name = container['name']
-                if self.container_exists(name) and self.container_running(name):
-                    click.echo(f"Stopping {name}...")
-                    # Note: We don't cleanup networking on stop, only on destroy
-                    self.run_command(['lxc', 'stop', name])
-                else:
-                    click.echo(f"Container {name} not running")
+                if states.get(container['name']) != 'Running':
+                    click.echo(f"Container {container['name']} not running")
+            
+            # Stop dependents before what they depend on. Walking the dependency order
+            # backwards, each container goes one wave after the latest of its dependents,
+            # and every container within a wave can be stopped at the same time.
+            waves = {}
+            if self.dependency_cycle:
+                # No valid dependency order, stop one at a time in reverse config order
+                click.echo(f"{YELLOW}⚠{NC} Circular dependency between containers: {self.dependency_cycle}")
+                click.echo(f"  Stopping in reverse config order")
+                for wave, container in enumerate(reversed(self.containers)):
+                    waves[container['name']] = wave
+            else:
+                names = {container['name'] for container in self.containers}
+                for container in reversed(self.containers):
+                    name = container['name']
+                    waves.setdefault(name, 0)
+                    deps = container.get('depends_on') or []
+                    if isinstance(deps, str):
+                        deps = [deps]
+                    for dep in deps:
+                        if dep in names:
+                            waves[dep] = max(waves.get(dep, 0), waves[name] + 1)
+            
+            def stop_one(name):
+                # Note: We don't cleanup networking on stop, only on destroy
+                return self.run_command(['lxc', 'stop', name], check=False)
+            
+            for wave in range(max(waves.values(), default=-1) + 1):
+                running = [name for name, level in waves.items()
+                           if level == wave and states.get(name) == 'Running']
+                failed = False
+                for name, result in self.run_parallel(stop_one, running):
+                    if result.returncode == 0:
+                        click.echo(f"Stopped {name}")
+                    else:
+                        click.echo(f"{RED}✗{NC} Failed to stop {name}: {result.stderr.strip()}")
+                        failed = True
+                # Leave the dependencies running if something that needs them didn't stop
+                if failed:
+                    sys.exit(1)
             
             click.echo(f"\n{GREEN}✓{NC} All containers stopped")
     
@@ -1523,31 +1825,44 @@ class LXCCompose:
                 click.echo(f"{YELLOW}No containers found on system{NC}")
                 return
                 
+            # Cleanup networking serially - hosts files and iptables rule
+            # numbers are shared state that concurrent edits would corrupt
             for name in containers:
-                click.echo(f"Destroying {name}...")
-                if self.container_running(name):
-                    self.run_command(['lxc', 'stop', name])
-                
-                # Cleanup networking
+                click.echo(f"Cleaning up networking for {name}...")
                 self.cleanup_container_networking(name)
-                
-                # Delete container
-                self.run_command(['lxc', 'delete', name])
+            
+            # Stop (if running) and delete containers concurrently
+            def delete_one(name):
+                return self.run_command(['lxc', 'delete', '--force', name], check=False)
+            
+            failed = False
+            for name, result in self.run_parallel(delete_one, containers):
+                if result.returncode == 0:
+                    click.echo(f"Destroyed {name}")
+                else:
+                    click.echo(f"{RED}✗{NC} Failed to destroy {name}: {result.stderr.strip()}")
+                    failed = True
+            if failed:
+                sys.exit(1)
         else:
             click.echo(f"{BOLD}Destroying containers from {self.config_file}...{NC}")
-            
-            for container in self.containers:
+            if self.dependency_cycle:
+                click.echo(f"{YELLOW}⚠{NC} Circular dependency between containers: {self.dependency_cycle}")
+                click.echo(f"  Destroying in reverse config order")
+            
+            # Dependents go before the containers they depend on (reverse config
+            # order when there is a cycle, as the containers are left unsorted)
+            states = self.get_container_states()
+            for container in reversed(self.containers):
                 name = container['name']
-                if self.container_exists(name):
+                if name in states:
                     click.echo(f"Destroying {name}...")
-                    if self.container_running(name):
-                        self.run_command(['lxc', 'stop', name])
                     
                     # Cleanup networking
                     self.cleanup_container_networking(name)
                     
-                    # Delete container
-                    self.run_command(['lxc', 'delete', name])
+                    # Stop (if running) and delete container in one call
+                    self.run_command(['lxc', 'delete', '--force', name])
                 else:
                     click.echo(f"Container {name} doesn't exist")
                     # Still try to cleanup any lingering network config
@@ -1580,6 +1895,10 @@ class LXCCompose:
             
             filtered_containers.append(container)
         
+        # IPs come straight from the 'lxc list' output, no per-container lookups
+        container_ips = {c['name']: self.extract_container_ip(c)
+                         for c in filtered_containers if c.get('status') == 'Running'}
+        
         # If JSON output requested, output and return
         if output_json:
             # Add additional info to each container
@@ -1597,7 +1916,7 @@ class LXCCompose:
                 
                 # Add IP if running
                 if status == 'Running':
-                    ip = self.get_container_ip(name)
+                    ip = container_ips.get(name)
                     if ip:
                         container_info['ip'] = ip
                 
@@ -1617,7 +1936,8 @@ class LXCCompose:
                 click.echo(f"{YELLOW}No containers found{NC}")
             return
         
-        # Prepare table data
+        # Prepare table data (saved metadata is read once for all rows)
+        metadata = self.load_container_metadata()
         table_data = []
         for container in filtered_containers:
             name = container['name']
@@ -1629,7 +1949,7 @@ class LXCCompose:
             ipv6 = '-'
             if status == 'Running':
                 # Get IPv4
-                ip = self.get_container_ip(name)
+                ip = container_ips.get(name)
                 if ip:
                     ipv4 = ip
                 
@@ -1650,7 +1970,7 @@ class LXCCompose:
             in_config = '✓' if name in config_containers else ''
             
             # Get exposed ports from saved data
-            saved_ports = self.get_saved_container_ports(name)
+            saved_ports = self.get_saved_container_ports(name, metadata)
             if saved_ports:
                 ports = ','.join(str(p) for p in saved_ports)
             else:
@@ -1680,51 +2000,28 @@ class LXCCompose:
         for key in col_widths:
             col_widths[key] += 2
         
-        # Print header
-        header_line = "+"
-        for key in ['name', 'status', 'ipv4', 'ipv6', 'type', 'ports']:
-            header_line += "-" * (col_widths[key] + 1) + "+"
+        # Column order and titles, shared by the border, header and data rows
+        columns = [('name', 'NAME'), ('status', 'STATE'), ('ipv4', 'IPV4'),
+                   ('ipv6', 'IPV6'), ('type', 'TYPE'), ('ports', 'PORTS')]
+        status_colors = {'Running': GREEN, 'Stopped': YELLOW}
         
-        click.echo(header_line)
+        header_line = "+" + "".join("-" * (col_widths[key] + 1) + "+" for key, _ in columns)
+        header = "|" + "".join(f" {title.center(col_widths[key])}|" for key, title in columns)
         
-        # Print column headers
-        header = "|"
-        header += f" {'NAME'.center(col_widths['name'])}|"
-        header += f" {'STATE'.center(col_widths['status'])}|"
-        header += f" {'IPV4'.center(col_widths['ipv4'])}|"
-        header += f" {'IPV6'.center(col_widths['ipv6'])}|"
-        header += f" {'TYPE'.center(col_widths['type'])}|"
-        header += f" {'PORTS'.center(col_widths['ports'])}|"
-        click.echo(header)
+        # Collect the whole table and write it out once
+        table_lines = [header_line, header, header_line]
         
-        click.echo(header_line)
-        
-        # Print data rows
         for row in table_data:
-            # Color code status
+            # Color code status (padding is added outside the color codes)
             status = row['status']
-            if status == 'Running':
-                status_color = GREEN
-                status_display = f"{status_color}{status.upper()}{NC}"
-            elif status == 'Stopped':
-                status_color = YELLOW
-                status_display = f"{status_color}{status.upper()}{NC}"
-            else:
-                status_color = RED
-                status_display = f"{status_color}{status.upper()}{NC}"
-            
-            # Build row
-            data_row = "|"
-            data_row += f" {row['name'].ljust(col_widths['name'])}|"
-            data_row += f" {status_display.ljust(col_widths['status'] + len(status_color) + len(NC))}|"
-            data_row += f" {row['ipv4'].center(col_widths['ipv4'])}|"
-            data_row += f" {row['ipv6'].center(col_widths['ipv6'])}|"
-            data_row += f" {row['type'].center(col_widths['type'])}|"
-            data_row += f" {row['ports'].center(col_widths['ports'])}|"
-            
-            click.echo(data_row)
+            cells = {key: row[key].center(col_widths[key]) for key in ('ipv4', 'ipv6', 'type', 'ports')}
+            cells['name'] = row['name'].ljust(col_widths['name'])
+            cells['status'] = (f"{status_colors.get(status, RED)}{status.upper()}{NC}"
+                               + " " * (col_widths['status'] - len(status)))
+            table_lines.append("|" + "".join(f" {cells[key]}|" for key, _ in columns))
         
-        click.echo(header_line)
+        table_lines.append(header_line)
+        click.echo('\n'.join(table_lines))
         
         # Show filter info if applicable
         if status_filter['running'] or status_filter['stopped'] or config_file:
@@ -1737,6 +2034,27 @@ class LXCCompose:
                 filter_info.append(f"config: {config_file}")
             click.echo(f"\n{BLUE}Filter: {', '.join(filter_info)}{NC}")
 
+def get_running_container(container_name: str) -> Dict:
+    """Get the lxc list entry for a container, exiting if it is missing or stopped"""
+    # 'lxc list' (unlike a raw 'lxc query') applies the client's current project
+    result = spawn(['lxc', 'list', f'^{container_name}$', '--format=json'], 
+                          capture_output=True, text=True)
+    if result.returncode != 0:
+        click.echo(f"{RED}✗{NC} Failed to check container: {result.stderr}")
+        sys.exit(1)
+    
+    containers = json.loads(result.stdout)
+    if not containers:
+        click.echo(f"{RED}✗{NC} Container '{container_name}' not found")
+        sys.exit(1)
+    
+    container = containers[0]
+    if container.get('status') != 'Running':
+        click.echo(f"{YELLOW}⚠{NC} Container '{container_name}' is not running")
+        sys.exit(1)
+    
+    return container
+
 # Confirmation helper
 def confirm_all_operation(operation: str):
     """Require confirmation for --all operations"""
@@ -1805,7 +2123,7 @@ def list_cmd(file, running, stopped, output_json):
     if file and os.path.exists(file):
         try:
             with open(file, 'r') as f:
-                config = yaml.safe_load(f)
+                config = load_yaml(f)
                 containers = config.get('containers', {})
                 if isinstance(containers, dict):
                     config_containers = [name for name in containers.keys()]
@@ -1835,22 +2153,7 @@ def destroy(file, all_containers):
 @click.option('--command', '-c', default=None, help='Command to execute instead of shell')
 def ssh(container_name, command):
     """SSH into a container (opens interactive shell)"""
-    # Check if container exists
-    result = subprocess.run(['lxc', 'list', container_name, '--format=json'], 
-                          capture_output=True, text=True)
-    if result.returncode != 0:
-        click.echo(f"{RED}✗{NC} Failed to check container: {result.stderr}")
-        sys.exit(1)
-    
-    containers = json.loads(result.stdout)
-    if not containers:
-        click.echo(f"{RED}✗{NC} Container '{container_name}' not found")
-        sys.exit(1)
-    
-    container = containers[0]
-    if container.get('status') != 'Running':
-        click.echo(f"{YELLOW}⚠{NC} Container '{container_name}' is not running")
-        sys.exit(1)
+    container = get_running_container(container_name)
     
     # Detect the OS type to determine which shell to use
     shell = 'bash'  # Default to bash
@@ -1873,13 +2176,11 @@ def ssh(container_name, command):
         click.echo(f"Connecting to {container_name} ({shell})...")
         exec_cmd = ['lxc', 'exec', container_name, '--', shell]
     
-    # Execute the command interactively
+    # Hand the terminal over to lxc exec (replaces this process, exit code propagates)
+    sys.stdout.flush()
     try:
-        subprocess.run(exec_cmd)
-    except KeyboardInterrupt:
-        # Clean exit on Ctrl+C
-        pass
-    except Exception as e:
+        os.execvp(exec_cmd[0], exec_cmd)
+    except OSError as e:
         click.echo(f"{RED}✗{NC} Failed to connect: {e}")
         sys.exit(1)
 
@@ -1897,26 +2198,10 @@ def logs(container_name, log_name, file, follow, lines):
         lxc-compose logs sample-django-app celery --follow
         lxc-compose logs sample-datastore postgres -n 50
     """
-    # Check if container exists
-    result = subprocess.run(['lxc', 'list', container_name, '--format=json'], 
-                          capture_output=True, text=True)
-    if result.returncode != 0:
-        click.echo(f"{RED}✗{NC} Failed to check container: {result.stderr}")
-        sys.exit(1)
-    
-    containers = json.loads(result.stdout)
-    if not containers:
-        click.echo(f"{RED}✗{NC} Container '{container_name}' not found")
-        sys.exit(1)
+    get_running_container(container_name)
     
-    container = containers[0]
-    if container.get('status') != 'Running':
-        click.echo(f"{YELLOW}⚠{NC} Container '{container_name}' is not running")
-        sys.exit(1)
-    
-    # Load config to get logs definitions
+    # Load config to get logs definitions (parsed by the constructor)
     compose = LXCCompose(file)
-    compose.load_config()
     
     # Find container in config
     container_config = None
@@ -1971,27 +2256,29 @@ def logs(container_name, log_name, file, follow, lines):
                     click.echo(f"  {GREEN}•{NC} {name}")
                 sys.exit(1)
     
-    # First check if the log file exists
-    check_cmd = ['lxc', 'exec', container_name, '--', 'test', '-f', log_path]
-    check_result = subprocess.run(check_cmd, capture_output=True)
+    # Check the log file exists and get its size in one container session
+    stat_cmd = ['lxc', 'exec', container_name, '--', 'stat', '-L', '-c', '%F:%s', log_path]
+    stat_result = spawn(stat_cmd, capture_output=True, text=True)
+    file_type, _, file_size = stat_result.stdout.strip().rpartition(':')
     
-    if check_result.returncode != 0:
-        click.echo(f"{YELLOW}⚠{NC} Log file {log_path} does not exist yet on {container_name}")
-        click.echo(f"  The log file will be created when the service starts logging.")
+    if stat_result.returncode != 0 or not file_type.startswith('regular'):
+        error_lines = [
+            f"{YELLOW}⚠{NC} Log file {log_path} does not exist yet on {container_name}",
+            f"  The log file will be created when the service starts logging.",
+        ]
         
         # Check if the directory exists
         dir_path = '/'.join(log_path.split('/')[:-1])
         dir_check_cmd = ['lxc', 'exec', container_name, '--', 'test', '-d', dir_path]
-        dir_result = subprocess.run(dir_check_cmd, capture_output=True)
+        dir_result = spawn(dir_check_cmd, capture_output=True)
         if dir_result.returncode != 0:
-            click.echo(f"  Log directory {dir_path} also doesn't exist.")
+            error_lines.append(f"  Log directory {dir_path} also doesn't exist.")
         
+        click.echo('\n'.join(error_lines))
         sys.exit(1)
     
     # Check if file is empty
-    size_cmd = ['lxc', 'exec', container_name, '--', 'stat', '-c', '%s', log_path]
-    size_result = subprocess.run(size_cmd, capture_output=True, text=True)
-    if size_result.returncode == 0 and size_result.stdout.strip() == '0':
+    if file_size == '0':
         click.echo(f"{YELLOW}⚠{NC} Log file {log_path} exists but is empty on {container_name}")
         if follow:
             click.echo(f"  Waiting for log output... (Ctrl+C to exit)")
@@ -2009,19 +2296,12 @@ def logs(container_name, log_name, file, follow, lines):
     # Execute the command
     try:
         if follow:
-            # For continuous streaming, use Popen to stream output in real-time
-            process = subprocess.Popen(tail_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-            try:
-                # Stream output line by line
-                for line in process.stdout:
-                    click.echo(line, nl=False)
-            except KeyboardInterrupt:
-                # Clean exit on Ctrl+C
-                process.terminate()
-                click.echo(f"\n{GREEN}✓{NC} Log streaming stopped")
+            # Hand the terminal over to tail (replaces this process, Ctrl+C goes to lxc exec)
+            sys.stdout.flush()
+            os.execvp(tail_cmd[0], tail_cmd)
         else:
             # For non-follow mode, use run() as before
-            result = subprocess.run(tail_cmd, capture_output=True, text=True)
+            result = spawn(tail_cmd, capture_output=True, text=True)
             if result.returncode != 0:
                 if "No such file or directory" in result.stderr:
                     click.echo(f"{YELLOW}⚠{NC} Log file not found: {log_path}")
@@ -2042,7 +2322,7 @@ def logs(container_name, log_name, file, follow, lines):
 
 @cli.command()
 @click.argument('container_name', required=False)
-@click.argument('test_type', required=False, default='all')
+@click.argument('test_type', required=False, default='all', type=click.Choice([*TEST_TYPES, 'list']))
 @click.option('-f', '--file', default=DEFAULT_CONFIG, help='Config file (default: lxc-compose.yml)')
 def test(container_name, test_type, file):
     """Run health check tests for containers
@@ -2056,82 +2336,52 @@ def test(container_name, test_type, file):
         lxc-compose test sample-django-app external     # Run only external tests
         lxc-compose test sample-django-app port_forwarding  # Run only port forwarding tests
     """
-    # Load config to get test definitions
+    # Load config to get test definitions (parsed by the constructor)
     compose = LXCCompose(file)
-    compose.load_config()
+    
+    # Parse test entries with library path resolution support
+    def parse_tests(test_list):
+        tests = {}
+        for test_entry in test_list:
+            if isinstance(test_entry, str) and ':' in test_entry:
+                # Format: name:path, optionally followed by @library:/library/path
+                main_part, _, library_path = test_entry.partition('@library:')
+                name, _, path = main_part.partition(':')
+                tests[name] = {'path': path, 'library_path': library_path or None}
+        return tests
     
     # Helper function to list tests for a container
     def list_container_tests(container_name, tests_config):
         click.echo(f"\n{GREEN}Container: {container_name}{NC}")
         if isinstance(tests_config, dict):
-            # Show internal tests
-            internal_tests = tests_config.get('internal', [])
-            if internal_tests:
-                click.echo(f"  {BLUE}Internal tests:{NC}")
-                for test_entry in internal_tests:
-                    if isinstance(test_entry, str) and ':' in test_entry:
-                        # Handle library path metadata
-                        if '@library:' in test_entry:
-                            main_part, library_path = test_entry.split('@library:', 1)
-                            name, path = main_part.split(':', 1)
-                            click.echo(f"    • {name}: {path} (from library)")
-                        else:
-                            name, path = test_entry.split(':', 1)
-                            click.echo(f"    • {name}: {path}")
-            
-            # Show external tests
-            external_tests = tests_config.get('external', [])
-            if external_tests:
-                click.echo(f"  {BLUE}External tests:{NC}")
-                for test_entry in external_tests:
-                    if isinstance(test_entry, str) and ':' in test_entry:
-                        # Handle library path metadata
-                        if '@library:' in test_entry:
-                            main_part, library_path = test_entry.split('@library:', 1)
-                            name, path = main_part.split(':', 1)
-                            click.echo(f"    • {name}: {path} (from library)")
-                        else:
-                            name, path = test_entry.split(':', 1)
-                            click.echo(f"    • {name}: {path}")
-            
-            # Show port forwarding tests
-            port_forwarding_tests = tests_config.get('port_forwarding', [])
-            if port_forwarding_tests:
-                click.echo(f"  {BLUE}Port forwarding tests:{NC}")
-                for test_entry in port_forwarding_tests:
-                    if isinstance(test_entry, str) and ':' in test_entry:
-                        # Handle library path metadata
-                        if '@library:' in test_entry:
-                            main_part, library_path = test_entry.split('@library:', 1)
-                            name, path = main_part.split(':', 1)
-                            click.echo(f"    • {name}: {path} (from library)")
-                        else:
-                            name, path = test_entry.split(':', 1)
-                            click.echo(f"    • {name}: {path}")
+            for category, label in (('internal', 'Internal tests'),
+                                    ('external', 'External tests'),
+                                    ('port_forwarding', 'Port forwarding tests')):
+                test_list = tests_config.get(category, [])
+                if test_list:
+                    click.echo(f"  {BLUE}{label}:{NC}")
+                    for name, test_info in parse_tests(test_list).items():
+                        source = " (from library)" if test_info['library_path'] else ""
+                        click.echo(f"    • {name}: {test_info['path']}{source}")
+    
+    # Status of every container, filled on first use by run_container_tests
+    container_states = None
     
     # Helper function to run tests for a container
     def run_container_tests(container_name, container_config, test_type):
-        # Validate test_type
-        valid_types = ['all', 'internal', 'external', 'port_forwarding']
-        if test_type not in valid_types:
-            click.echo(f"{RED}✗{NC} Invalid test type: {test_type}")
-            click.echo(f"Valid types: {', '.join(valid_types)}")
-            return {'passed': 0, 'failed': 1}
-        
-        # Check if container exists
-        result = subprocess.run(['lxc', 'list', container_name, '--format', 'json'], 
-                              capture_output=True, text=True)
-        if result.returncode != 0:
-            click.echo(f"{RED}✗{NC} Failed to list container: {result.stderr}")
-            return {'passed': 0, 'failed': 1}
-        
-        containers = json.loads(result.stdout)
-        if not containers:
+        # test_type is already validated by click
+        categories = TEST_TYPE_CATEGORIES[test_type]
+        
+        # Check if container exists (states are queried once per test run)
+        nonlocal container_states
+        if container_states is None:
+            container_states = compose.get_container_states()
+        status = container_states.get(container_name)
+        if status is None:
             click.echo(f"{RED}✗{NC} Container '{container_name}' not found")
             return {'passed': 0, 'failed': 1}
         
-        container = containers[0]
-        if container.get('status') != 'Running':
+        if status != 'Running':
             click.echo(f"{YELLOW}⚠{NC} Container '{container_name}' is not running")
             return {'passed': 0, 'failed': 1}
         
@@ -2154,24 +2404,6 @@ def test(container_name, test_type, file):
         elif isinstance(tests_config, list):
             internal_tests = tests_config
         
-        # Parse test entries with library path resolution support
-        def parse_tests(test_list):
-            tests = {}
-            for test_entry in test_list:
-                if isinstance(test_entry, str) and ':' in test_entry:
-                    # Check if test has library path metadata
-                    if '@library:' in test_entry:
-                        # Format: name:path@library:/library/path
-                        main_part, library_path = test_entry.split('@library:', 1)
-                        name, path = main_part.split(':', 1)
-                        # Store both the path and library location
-                        tests[name] = {'path': path, 'library_path': library_path}
-                    else:
-                        # Regular test definition
-                        name, path = test_entry.split(':', 1)
-                        tests[name] = {'path': path, 'library_path': None}
-            return tests
-        
         internal_test_map = parse_tests(internal_tests)
         external_test_map = parse_tests(external_tests)
         port_forwarding_test_map = parse_tests(port_forwarding_tests)
@@ -2185,7 +2417,7 @@ def test(container_name, test_type, file):
         results = {'passed': 0, 'failed': 0}
         
         # Run internal tests
-        if test_type in ['all', 'internal'] and internal_test_map:
+        if 'internal' in categories and internal_test_map:
             click.echo(f"{BLUE}=== Internal Tests (running inside container) ==={NC}")
             for test_name, test_info in internal_test_map.items():
                 click.echo(f"\nRunning internal test: {test_name}")
@@ -2193,13 +2425,9 @@ def test(container_name, test_type, file):
                 # Extract test path
                 test_path = test_info['path'] if isinstance(test_info, dict) else test_info
                 
-                # First, make the script executable
-                chmod_cmd = ['lxc', 'exec', container_name, '--', 'chmod', '+x', test_path]
-                subprocess.run(chmod_cmd, capture_output=True)
-                
-                # Run the test script inside the container
+                # Run the script with bash directly, no wrapper shell or exec bit needed
                 test_cmd = ['lxc', 'exec', container_name, '--', 'bash', test_path]
-                result = subprocess.run(test_cmd, capture_output=False, text=True)
+                result = spawn(test_cmd, capture_output=False, text=True)
                 
                 if result.returncode == 0:
                     results['passed'] += 1
@@ -2207,7 +2435,7 @@ def test(container_name, test_type, file):
                     results['failed'] += 1
         
         # Run external tests
-        if test_type in ['all', 'external'] and external_test_map:
+        if 'external' in categories and external_test_map:
             click.echo(f"\n{BLUE}=== External Tests (running from host) ==={NC}")
             for test_name, test_info in external_test_map.items():
                 click.echo(f"\nRunning external test: {test_name}")
@@ -2226,8 +2454,7 @@ def test(container_name, test_type, file):
                     actual_test_path = os.path.join(library_path, test_path.lstrip('/'))
                 else:
                     # Test is from local config
-                    config_dir = os.path.dirname(os.path.abspath(file))
-                    actual_test_path = os.path.join(config_dir, test_path.lstrip('/app/'))
+                    actual_test_path = os.path.join(compose.config_dir, test_path.lstrip('/app/'))
                 
                 if not os.path.exists(actual_test_path):
                     click.echo(f"{YELLOW}⚠{NC} Test script not found: {actual_test_path}")
@@ -2240,7 +2467,7 @@ def test(container_name, test_type, file):
                 os.chmod(actual_test_path, 0o755)
                 
                 # Run the test script on the host
-                result = subprocess.run(['bash', actual_test_path], capture_output=False, text=True)
+                result = spawn(['bash', actual_test_path], capture_output=False, text=True)
                 
                 if result.returncode == 0:
                     results['passed'] += 1
@@ -2248,7 +2475,7 @@ def test(container_name, test_type, file):
                     results['failed'] += 1
         
         # Run port forwarding tests
-        if test_type in ['all', 'port_forwarding'] and port_forwarding_test_map:
+        if 'port_forwarding' in categories and port_forwarding_test_map:
             click.echo(f"\n{BLUE}=== Port Forwarding Tests (checking iptables rules) ==={NC}")
             for test_name, test_info in port_forwarding_test_map.items():
                 click.echo(f"\nRunning port forwarding test: {test_name}")
@@ -2267,8 +2494,7 @@ def test(container_name, test_type, file):
                     actual_test_path = os.path.join(library_path, test_path.lstrip('/'))
                 else:
                     # Port forwarding tests run on the host
-                    config_dir = os.path.dirname(os.path.abspath(file))
-                    actual_test_path = os.path.join(config_dir, test_path.lstrip('/app/'))
+                    actual_test_path = os.path.join(compose.config_dir, test_path.lstrip('/app/'))
                 
                 if not os.path.exists(actual_test_path):
                     click.echo(f"{YELLOW}⚠{NC} Test script not found: {actual_test_path}")
@@ -2281,7 +2507,7 @@ def test(container_name, test_type, file):
                 os.chmod(actual_test_path, 0o755)
                 
                 # Run the test script on the host
-                result = subprocess.run(['bash', actual_test_path], capture_output=False, text=True)
+                result = spawn(['bash', actual_test_path], capture_output=False, text=True)
                 
                 if result.returncode == 0:
                     results['passed'] += 1
@@ -2311,19 +2537,23 @@ def test(container_name, test_type, file):
             click.echo(f"{YELLOW}No containers with tests found in {file}{NC}")
             return
         
-        # Display total summary
-        click.echo(f"\n{BLUE}{'='*50}{NC}")
-        click.echo(f"{BLUE}Total Test Summary{NC}")
-        click.echo(f"{BLUE}{'='*50}{NC}")
-        click.echo(f"Containers Tested: {containers_tested}")
-        click.echo(f"Tests Passed: {GREEN}{total_results['passed']}{NC}")
-        click.echo(f"Tests Failed: {RED}{total_results['failed']}{NC}")
+        # Display total summary (single write)
+        summary = [
+            f"\n{BLUE}{'='*50}{NC}",
+            f"{BLUE}Total Test Summary{NC}",
+            f"{BLUE}{'='*50}{NC}",
+            f"Containers Tested: {containers_tested}",
+            f"Tests Passed: {GREEN}{total_results['passed']}{NC}",
+            f"Tests Failed: {RED}{total_results['failed']}{NC}",
+        ]
         
         if total_results['failed'] == 0:
-            click.echo(f"\n{GREEN}✓ All tests passed!{NC}")
+            summary.append(f"\n{GREEN}✓ All tests passed!{NC}")
+            click.echo('\n'.join(summary))
             sys.exit(0)
         else:
-            click.echo(f"\n{RED}✗ Some tests failed!{NC}")
+            summary.append(f"\n{RED}✗ Some tests failed!{NC}")
+            click.echo('\n'.join(summary))
             sys.exit(1)
     
     # If test_type is 'list', show tests for the specified container
@@ -2361,18 +2591,22 @@ def test(container_name, test_type, file):
     # Run the tests
     results = run_container_tests(container_name, container_config, test_type)
     
-    # Display summary
-    click.echo(f"\n{BLUE}{'='*50}{NC}")
-    click.echo(f"{BLUE}Test Summary for {container_name}{NC}")
-    click.echo(f"{BLUE}{'='*50}{NC}")
-    click.echo(f"Tests Passed: {GREEN}{results['passed']}{NC}")
-    click.echo(f"Tests Failed: {RED}{results['failed']}{NC}")
+    # Display summary (single write)
+    summary = [
+        f"\n{BLUE}{'='*50}{NC}",
+        f"{BLUE}Test Summary for {container_name}{NC}",
+        f"{BLUE}{'='*50}{NC}",
+        f"Tests Passed: {GREEN}{results['passed']}{NC}",
+        f"Tests Failed: {RED}{results['failed']}{NC}",
+    ]
     
     if results['failed'] == 0:
-        click.echo(f"\n{GREEN}✓ All tests passed!{NC}")
+        summary.append(f"\n{GREEN}✓ All tests passed!{NC}")
+        click.echo('\n'.join(summary))
         sys.exit(0)
     else:
-        click.echo(f"\n{RED}✗ Some tests failed!{NC}")
+        summary.append(f"\n{RED}✗ Some tests failed!{NC}")
+        click.echo('\n'.join(summary))
         sys.exit(1)
 
 if __name__ == '__main__':
@@ -5,7 +5,6 @@ Handles loading and merging template configurations and library includes
 """
 
 import os
-import yaml
 from typing import Dict, Any, List
 
 class TemplateHandler:
@@ -32,8 +31,9 @@ class TemplateHandler:
         if not os.path.exists(template_file):
             raise ValueError(f"Template not found: {template_name}")
         
+        import yaml
         with open(template_file, 'r') as f:
-            template_config = yaml.safe_load(f)
+            template_config = yaml.load(f, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
         
         # Check if this is an alias template
         if 'alias' in template_config:
@@ -86,8 +86,9 @@ class TemplateHandler:
             return None
         
         # Load the service configuration
+        import yaml
         with open(service_file, 'r') as f:
-            service_config = yaml.safe_load(f)
+            service_config = yaml.load(f, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
         
         # Extract the container configuration
         if 'containers' in service_config:
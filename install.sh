@@ -170,11 +170,13 @@ install_dependencies() {
     fi
     
     # Install other required packages
+    # (libyaml-0-2 provides the C YAML loader that python3-yaml uses for fast parsing)
     apt-get install -y \
         lxc \
         python3 \
         python3-click \
         python3-yaml \
+        libyaml-0-2 \
         iptables \
         curl \
         wget \
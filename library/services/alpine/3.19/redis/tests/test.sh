@@ -9,8 +9,10 @@ GREEN='\033[0;32m'
 RED='\033[0;31m'
 NC='\033[0m'
 
+CONTAINER_NAME=redis-alpine-3-19
+
 # Get container IP
-CONTAINER_IP=$(lxc list redis-alpine-3-19 -f json | jq -r '.[0].state.network.eth0.addresses[] | select(.family=="inet").address')
+CONTAINER_IP=$(lxc list $CONTAINER_NAME -f json | jq -r '.[0].state.network.eth0.addresses[] | select(.family=="inet").address')
 
 if [ -z "$CONTAINER_IP" ]; then
     echo -e "${RED}✗${NC} Could not determine container IP"
@@ -19,11 +21,22 @@ fi
 
 echo "Redis IP: $CONTAINER_IP"
 
-# Test using lxc exec to run redis-alpine-3-19-cli commands
+# Commands are pipelined through one redis-cli per session (replies come
+# back one per line); the expiry check needs a second session after the TTL
+mapfile -t R < <(lxc exec $CONTAINER_NAME -- redis-cli 2>&1 <<'REDIS' | tr -d '\r'
+SET test_key test_value
+GET test_key
+RPUSH test_list item1 item2 item3
+LLEN test_list
+HSET test_hash field1 value1 field2 value2
+HGET test_hash field1
+SETEX test_expire 2 will_expire
+REDIS
+)
+
 echo ""
 echo "1. Setting a key-value pair..."
-lxc exec redis-alpine-3-19 -- redis-alpine-3-19-cli SET test_key "test_value"
-if [ $? -eq 0 ]; then
+if [ "${R[0]}" = "OK" ]; then
     echo -e "${GREEN}✓${NC} Key set"
 else
     echo -e "${RED}✗${NC} Failed to set key"
@@ -32,18 +45,16 @@ fi
 
 echo ""
 echo "2. Getting the value..."
-RESULT=$(lxc exec redis-alpine-3-19 -- redis-alpine-3-19-cli GET test_key | tr -d '\r\n')
-if [ "$RESULT" = "test_value" ]; then
-    echo -e "${GREEN}✓${NC} Value retrieved: $RESULT"
+if [ "${R[1]}" = "test_value" ]; then
+    echo -e "${GREEN}✓${NC} Value retrieved: ${R[1]}"
 else
-    echo -e "${RED}✗${NC} Failed to get correct value (got: $RESULT)"
+    echo -e "${RED}✗${NC} Failed to get correct value (got: ${R[1]})"
     exit 1
 fi
 
 echo ""
 echo "3. Creating a list..."
-lxc exec redis-alpine-3-19 -- redis-alpine-3-19-cli RPUSH test_list "item1" "item2" "item3" > /dev/null
-if [ $? -eq 0 ]; then
+if [[ "${R[2]}" =~ ^[0-9]+$ ]]; then
     echo -e "${GREEN}✓${NC} List created"
 else
     echo -e "${RED}✗${NC} Failed to create list"
@@ -52,18 +63,16 @@ fi
 
 echo ""
 echo "4. Getting list length..."
-LENGTH=$(lxc exec redis-alpine-3-19 -- redis-alpine-3-19-cli LLEN test_list | tr -d '\r\n')
-if [ "$LENGTH" = "3" ]; then
-    echo -e "${GREEN}✓${NC} List length correct: $LENGTH"
+if [ "${R[3]}" = "3" ]; then
+    echo -e "${GREEN}✓${NC} List length correct: ${R[3]}"
 else
-    echo -e "${RED}✗${NC} Incorrect list length (got: $LENGTH)"
+    echo -e "${RED}✗${NC} Incorrect list length (got: ${R[3]})"
     exit 1
 fi
 
 echo ""
 echo "5. Setting a hash..."
-lxc exec redis-alpine-3-19 -- redis-alpine-3-19-cli HSET test_hash field1 "value1" field2 "value2" > /dev/null
-if [ $? -eq 0 ]; then
+if [[ "${R[4]}" =~ ^[0-9]+$ ]]; then
     echo -e "${GREEN}✓${NC} Hash created"
 else
     echo -e "${RED}✗${NC} Failed to create hash"
@@ -72,37 +81,40 @@ fi
 
 echo ""
 echo "6. Getting hash field..."
-HASH_VALUE=$(lxc exec redis-alpine-3-19 -- redis-alpine-3-19-cli HGET test_hash field1 | tr -d '\r\n')
-if [ "$HASH_VALUE" = "value1" ]; then
-    echo -e "${GREEN}✓${NC} Hash field retrieved: $HASH_VALUE"
+if [ "${R[5]}" = "value1" ]; then
+    echo -e "${GREEN}✓${NC} Hash field retrieved: ${R[5]}"
 else
-    echo -e "${RED}✗${NC} Failed to get hash field (got: $HASH_VALUE)"
+    echo -e "${RED}✗${NC} Failed to get hash field (got: ${R[5]})"
     exit 1
 fi
 
 echo ""
 echo "7. Setting key with expiration..."
-lxc exec redis-alpine-3-19 -- redis-alpine-3-19-cli SETEX test_expire 2 "will_expire" > /dev/null
-if [ $? -eq 0 ]; then
-    echo -e "${GREEN}✓${NC} Expiring key set"
-    echo "  Waiting 3 seconds for expiration..."
-    sleep 3
-    EXPIRED=$(lxc exec redis-alpine-3-19 -- redis-alpine-3-19-cli GET test_expire | tr -d '\r\n')
-    if [ "$EXPIRED" = "" ] || [ "$EXPIRED" = "(nil)" ]; then
-        echo -e "${GREEN}✓${NC} Key expired correctly"
-    else
-        echo -e "${RED}✗${NC} Key did not expire (got: $EXPIRED)"
-        exit 1
-    fi
-else
+if [ "${R[6]}" != "OK" ]; then
     echo -e "${RED}✗${NC} Failed to set expiring key"
     exit 1
 fi
+echo -e "${GREEN}✓${NC} Expiring key set"
+echo "  Waiting 3 seconds for expiration..."
+sleep 3
+
+mapfile -t R < <(lxc exec $CONTAINER_NAME -- redis-cli 2>&1 <<'REDIS' | tr -d '\r'
+GET test_expire
+DEL test_key test_list test_hash
+EXISTS test_key test_list test_hash
+REDIS
+)
+
+if [ "${R[0]}" = "" ] || [ "${R[0]}" = "(nil)" ]; then
+    echo -e "${GREEN}✓${NC} Key expired correctly"
+else
+    echo -e "${RED}✗${NC} Key did not expire (got: ${R[0]})"
+    exit 1
+fi
 
 echo ""
 echo "8. Deleting test keys..."
-lxc exec redis-alpine-3-19 -- redis-alpine-3-19-cli DEL test_key test_list test_hash > /dev/null
-if [ $? -eq 0 ]; then
+if [[ "${R[1]}" =~ ^[0-9]+$ ]]; then
     echo -e "${GREEN}✓${NC} Keys deleted"
 else
     echo -e "${RED}✗${NC} Failed to delete keys"
@@ -111,8 +123,7 @@ fi
 
 echo ""
 echo "9. Verifying cleanup..."
-EXISTS=$(lxc exec redis-alpine-3-19 -- redis-alpine-3-19-cli EXISTS test_key test_list test_hash | tr -d '\r\n')
-if [ "$EXISTS" = "0" ]; then
+if [ "${R[2]}" = "0" ]; then
     echo -e "${GREEN}✓${NC} All test keys removed"
 else
     echo -e "${RED}✗${NC} Some keys still exist"
@@ -121,4 +132,4 @@ fi
 
 echo ""
 echo -e "${GREEN}✓ All Redis tests passed!${NC}"
-exit 0
\ No newline at end of file
+exit 0
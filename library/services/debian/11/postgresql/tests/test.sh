@@ -33,41 +33,54 @@ fi
 echo "PostgreSQL Container: $CONTAINER_NAME"
 echo "PostgreSQL IP: $CONTAINER_IP"
 
-# Test using lxc exec to run psql commands
+# Run every step in a single psql session (one lxc exec), marking each
+# completed step so failures can still be reported individually
+OUTPUT=$(lxc exec $CONTAINER_NAME -- su postgres -c "psql -X -q -t -A -v ON_ERROR_STOP=1 -d postgres" 2>&1 <<'SQL'
+CREATE DATABASE testdb;
+\echo STEP 1
+\c testdb
+CREATE TABLE test_table (id SERIAL PRIMARY KEY, name VARCHAR(50), created_at TIMESTAMP DEFAULT NOW());
+\echo STEP 2
+INSERT INTO test_table (name) VALUES ('Test Record');
+\echo STEP 3
+SELECT name FROM test_table WHERE name='Test Record';
+\echo STEP 4
+DELETE FROM test_table WHERE name='Test Record';
+\echo STEP 5
+DROP TABLE test_table;
+\echo STEP 6
+\c postgres
+DROP DATABASE testdb;
+\echo STEP 7
+SQL
+)
+
+check_step() {
+    if grep -qx "STEP $1" <<< "$OUTPUT"; then
+        echo -e "${GREEN}✓${NC} $2"
+    else
+        echo -e "${RED}✗${NC} $3"
+        grep -v '^STEP ' <<< "$OUTPUT"
+        exit 1
+    fi
+}
+
 echo ""
 echo "1. Creating test database..."
-lxc exec $CONTAINER_NAME -- su postgres -c "createdb testdb"
-if [ $? -eq 0 ]; then
-    echo -e "${GREEN}✓${NC} Database created"
-else
-    echo -e "${RED}✗${NC} Failed to create database"
-    exit 1
-fi
+check_step 1 "Database created" "Failed to create database"
 
 echo ""
 echo "2. Creating test table..."
-lxc exec $CONTAINER_NAME -- su postgres -c "psql -d testdb -c 'CREATE TABLE test_table (id SERIAL PRIMARY KEY, name VARCHAR(50), created_at TIMESTAMP DEFAULT NOW());'"
-if [ $? -eq 0 ]; then
-    echo -e "${GREEN}✓${NC} Table created"
-else
-    echo -e "${RED}✗${NC} Failed to create table"
-    exit 1
-fi
+check_step 2 "Table created" "Failed to create table"
 
 echo ""
 echo "3. Inserting test record..."
-lxc exec $CONTAINER_NAME -- su postgres -c "psql -d testdb -c \"INSERT INTO test_table (name) VALUES ('Test Record');\""
-if [ $? -eq 0 ]; then
-    echo -e "${GREEN}✓${NC} Record inserted"
-else
-    echo -e "${RED}✗${NC} Failed to insert record"
-    exit 1
-fi
+check_step 3 "Record inserted" "Failed to insert record"
 
 echo ""
 echo "4. Querying test record..."
-RESULT=$(lxc exec $CONTAINER_NAME -- su postgres -c "psql -d testdb -t -c \"SELECT name FROM test_table WHERE name='Test Record';\"" | tr -d ' ')
-if [ "$RESULT" = "TestRecord" ]; then
+RESULT=$(sed -n '/^STEP 3$/,/^STEP 4$/{/^STEP /!p}' <<< "$OUTPUT")
+if [ "$RESULT" = "Test Record" ]; then
     echo -e "${GREEN}✓${NC} Record found: $RESULT"
 else
     echo -e "${RED}✗${NC} Failed to query record"
@@ -76,34 +89,16 @@ fi
 
 echo ""
 echo "5. Deleting test record..."
-lxc exec $CONTAINER_NAME -- su postgres -c "psql -d testdb -c \"DELETE FROM test_table WHERE name='Test Record';\""
-if [ $? -eq 0 ]; then
-    echo -e "${GREEN}✓${NC} Record deleted"
-else
-    echo -e "${RED}✗${NC} Failed to delete record"
-    exit 1
-fi
+check_step 5 "Record deleted" "Failed to delete record"
 
 echo ""
 echo "6. Dropping test table..."
-lxc exec $CONTAINER_NAME -- su postgres -c "psql -d testdb -c 'DROP TABLE test_table;'"
-if [ $? -eq 0 ]; then
-    echo -e "${GREEN}✓${NC} Table dropped"
-else
-    echo -e "${RED}✗${NC} Failed to drop table"
-    exit 1
-fi
+check_step 6 "Table dropped" "Failed to drop table"
 
 echo ""
 echo "7. Dropping test database..."
-lxc exec $CONTAINER_NAME -- su postgres -c "dropdb testdb"
-if [ $? -eq 0 ]; then
-    echo -e "${GREEN}✓${NC} Database dropped"
-else
-    echo -e "${RED}✗${NC} Failed to drop database"
-    exit 1
-fi
+check_step 7 "Database dropped" "Failed to drop database"
 
 echo ""
 echo -e "${GREEN}✓ All PostgreSQL tests passed!${NC}"
-exit 0
\ No newline at end of file
+exit 0
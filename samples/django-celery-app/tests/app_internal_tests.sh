@@ -66,7 +66,7 @@ run_test "Django admin page" "curl -s http://127.0.0.1:8000/admin/ | grep -q 'Dj
 run_test "Nginx process" "ps aux | grep -v grep | grep nginx"
 
 # Test Nginx is listening on port 80
-run_test "Nginx port 80" "netstat -tln | grep :80 || ss -tln | grep :80"
+run_test "Nginx port 80" "ss -Htln | grep :80 || netstat -tln | grep :80"
 
 # Test Nginx is proxying to Django
 run_test "Nginx proxy to Django" "curl -s -o /dev/null -w '%{http_code}' http://127.0.0.1:80 | grep -q '200\|301\|302'"
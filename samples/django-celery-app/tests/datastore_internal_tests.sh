@@ -36,7 +36,7 @@ echo
 run_test "PostgreSQL process" "ps aux | grep -v grep | grep postgres"
 
 # Test PostgreSQL is listening on port 5432
-run_test "PostgreSQL port 5432" "netstat -tln | grep :5432 || ss -tln | grep :5432"
+run_test "PostgreSQL port 5432" "ss -Htln | grep :5432 || netstat -tln | grep :5432"
 
 # Test PostgreSQL can be connected to locally
 run_test "PostgreSQL local connection" "su postgres -c 'psql -c \"SELECT 1\"'"
@@ -54,7 +54,7 @@ run_test "Database user connection" "PGPASSWORD=\${DB_PASSWORD} psql -h localhos
 run_test "Redis process" "ps aux | grep -v grep | grep redis-server"
 
 # Test Redis is listening on port 6379
-run_test "Redis port 6379" "netstat -tln | grep :6379 || ss -tln | grep :6379"
+run_test "Redis port 6379" "ss -Htln | grep :6379 || netstat -tln | grep :6379"
 
 # Test Redis can be connected to
 run_test "Redis connection" "redis-cli ping | grep -q PONG"
@@ -64,7 +64,7 @@ test_check "Scripts are executable" "[ -x /docs/scripts/rebuild-docs.sh ]"
 # Check Nginx is serving content
 echo ""
 echo "Web Server:"
-test_check "Port 80 listening" "netstat -tln | grep -q ':80 '"
+test_check "Port 80 listening" "ss -Htln | grep -q ':80 ' || netstat -tln | grep -q ':80 '"
 test_check "Nginx responds locally" "curl -f http://localhost/health"
 test_check "Documentation accessible" "curl -f http://localhost/ | grep -q 'LXC Compose'"
 